@@ -6,7 +6,7 @@ block_cipher = None
 a = Analysis(['src/main.py'],
              pathex=['/usr/local/lib/python3.8/dist-packages/pynanosvg-0.3.1-py3.8-linux-x86_64.egg'],
              binaries=[],
-             datas=[('assets/*.svg', 'assets/'), ('assets/icons/*.svg', 'assets/icons/'), ('assets/*.ttf', 'assets/')],
+             datas=[('assets/assets.bin', 'assets/'), ('assets/deals/*.bin', 'assets/deals/'), ('assets/*.ttf', 'assets/')],
              hiddenimports=[],
              hookspath=[],
              runtime_hooks=[],
@@ -1,7 +1,5 @@
 from abc import ABC, abstractmethod
 
-import pygame
-
 import constants
 from card import Card
 
@@ -56,12 +54,14 @@ class FlipAnimation(Animation):
 
     def tick(self, time):
         super().tick(time)
-        surface = self.card.asset if (self.progress > .5) != (self.end) else self.card.back_asset
-        self.card.surface = pygame.transform.smoothscale(surface, (round(surface.get_width()*abs(self.map(-1, 2))), surface.get_height()))
+        self.card.surface = self.card.asset if (self.progress > .5) != (self.end) else self.card.back_asset
+        self.card.width_scale = abs(self.map(-1, 2))
 
     def cancel(self):
         super().cancel()
-        self.card.surface = self.card.back_asset if self.end else self.card.asset
+        # Picked again when the card is drawn
+        self.card.surface = None
+        self.card.width_scale = 1
 
 
 class ConcurrentAnimations(Animation):
@@ -1,40 +1,136 @@
+import mmap
 import os
+import struct
 import sys
+from threading import Thread
 
 import pygame
 from svg import Parser, Rasterizer
 
 import card
 
-card_svgs = None
-icon_svgs = None
-back_svg = None
-empty_svg = None
+BUNDLE = "assets.bin"
+BUNDLE_MAGIC = b"SOLB"
+# Magic, number of entries
+BUNDLE_HEADER = struct.Struct("<4sI")
+# Scale (0 for the svg source), width, height, offset, length, preceded by the name
+BUNDLE_ENTRY = struct.Struct("<fHHQQ")
+BUNDLE_NAME = struct.Struct("<H")
+
+card_files: dict[tuple, str] = None
+icon_files: dict[str, str] = None
+svgs: dict[str, object] = {}
 
 card_surfaces: dict[str, pygame.Surface] = None
 icon_surfaces: dict[str, pygame.Surface] = None
-back_surface: pygame.Surface = None
-empty_surface: pygame.Surface = None
+other_surfaces: dict[str, pygame.Surface] = None
+
+loader: Thread = None
+bundle: "Bundle" = None
+
+
+class Bundle():
+    def __init__(self, path):
+        super().__init__()
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        magic, count = BUNDLE_HEADER.unpack_from(self.map)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not an asset bundle")
+
+        self.entries: dict[tuple[str, float], tuple[int, int, int, int]] = {}
+        offset = BUNDLE_HEADER.size
+        for _ in range(count):
+            length, = BUNDLE_NAME.unpack_from(self.map, offset)
+            offset += BUNDLE_NAME.size
+            name = bytes(self.view[offset:offset+length]).decode()
+            offset += length
+            scale, *entry = BUNDLE_ENTRY.unpack_from(self.map, offset)
+            offset += BUNDLE_ENTRY.size
+            self.entries[(name, round(scale, 3))] = tuple(entry)
+
+        self.files = sorted({name for name, _ in self.entries})
+
+    def svg_data(self, file):
+        _, _, offset, length = self.entries[(file, 0)]
+        return bytes(self.view[offset:offset+length]).decode()
+
+    def surface(self, file, scale):
+        entry = self.entries.get((file, round(scale, 3)))
+        if entry is None:
+            return None
+
+        width, height, offset, length = entry
+        return pygame.image.frombuffer(self.view[offset:offset+length], (width, height), "RGBA")
+
+
+# Rasterizes each surface the first time it's used
+class LazySurfaces(dict):
+    def __init__(self, files, scale):
+        super().__init__()
+        self.files = files
+        self.scale = scale
+
+    def __missing__(self, key):
+        surface = self[key] = load_surface(self.files[key], self.scale)
+        return surface
 
 
 def get_icon():
-    return render_svg(load_svg("icon.svg"), 1, False)
+    return load_surface("icon.svg", 1, False)
+
+
+def get_back_surface():
+    return other_surfaces["back"]
+
+
+def get_empty_surface():
+    return other_surfaces["empty"]
+
+
+def load_bundle():
+    global bundle, card_files, icon_files
+    # card imports this module, so its enums are only ready at runtime
+    card_files = {(suit, symbol): f"{suit.value}_{symbol.value}.svg" for suit in card.Suit for symbol in card.Symbol}
+    try:
+        bundle = Bundle(normalize_path(BUNDLE))
+        files = bundle.files
+    except FileNotFoundError:
+        files = [f"icons/{file}" for file in os.listdir(normalize_path("icons"))]
+
+    icon_files = {file.removeprefix("icons/").removesuffix(".svg"): file for file in files if file.startswith("icons/") and file.endswith(".svg")}
 
 
 def load_svgs():
-    global card_svgs, icon_svgs, back_svg, empty_svg
-    card_svgs = {(suit, symbol): load_svg(f"{suit.value}_{symbol.value}.svg") for suit in card.Suit for symbol in card.Symbol}
-    icon_svgs = {file.removesuffix(".svg"): load_svg(os.path.join("icons", file)) for file in os.listdir(normalize_path("icons")) if file.endswith(".svg")}
-    back_svg = load_svg("back.svg")
-    empty_svg = load_svg("empty.svg")
+    for file in list(card_files.values()) + list(icon_files.values()) + ["back.svg", "empty.svg"]:
+        svgs[file] = load_svg(file)
+
+
+def load_svgs_async():
+    global loader
+    # The bundle's rasters cover the usual scales, so the rest are parsed on demand
+    if bundle is not None:
+        return
+
+    loader = Thread(target=load_svgs, name="load_svgs", daemon=True)
+    loader.start()
+
+
+def get_svg(file):
+    if loader is not None:
+        loader.join()
+    if file not in svgs:
+        svgs[file] = load_svg(file)
+    return svgs[file]
 
 
 def render_svgs(scale):
-    global card_surfaces, icon_surfaces, back_surface, empty_surface
-    card_surfaces = {k: render_svg(v, scale) for k, v in card_svgs.items()}
-    icon_surfaces = {k: render_svg(v, scale) for k, v in icon_svgs.items()}
-    back_surface = render_svg(back_svg, scale)
-    empty_surface = render_svg(empty_svg, scale)
+    global card_surfaces, icon_surfaces, other_surfaces
+    card_surfaces = LazySurfaces(card_files, scale)
+    icon_surfaces = LazySurfaces(icon_files, scale)
+    other_surfaces = LazySurfaces({"back": "back.svg", "empty": "empty.svg"}, scale)
 
 
 def normalize_path(file):
@@ -43,15 +139,30 @@ def normalize_path(file):
 
 
 def load_svg(file):
+    if bundle is not None:
+        return Parser.parse(bundle.svg_data(file))
     return Parser.parse_file(normalize_path(file))
 
 
+def load_surface(file, scale, convert_surface=True):
+    surface = bundle.surface(file, scale) if bundle is not None else None
+    if surface is None:
+        surface = render_svg(get_svg(file), scale, False)
+    return convert(surface) if convert_surface else surface
+
+
+# Surfaces only get the display's pixel format when there is a display surface,
+# textures are made straight from them
+def convert(surface):
+    return surface.convert_alpha() if pygame.display.get_surface() is not None else surface
+
+
 rasterizer = Rasterizer()
 
 
-def render_svg(svg, scale, convert=True):
+def render_svg(svg, scale, convert_surface=True):
     global rasterizer
     surface_size = round(svg.width * scale), round(svg.height * scale)
     buffer = rasterizer.rasterize(svg, *surface_size, scale)
     surface = pygame.image.frombuffer(buffer, surface_size, "RGBA")
-    return surface.convert_alpha() if convert else surface
+    return convert(surface) if convert_surface else surface
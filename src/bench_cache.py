@@ -0,0 +1,71 @@
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import random
+import tempfile
+import time
+
+from cache import INDEX, RECORD, STATUS, PositionCache, encode_move, position_hash
+from solver import Position, Result
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start)/repeat*1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the position cache with many entries")
+    parser.add_argument("-n", "--entries", type=int, default=1_000_000, help="entries to fill the cache with")
+    parser.add_argument("-l", "--lookups", type=int, default=200_000, help="lookups to time")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed for the hashes")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = [rng.getrandbits(64) for _ in range(args.entries)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PositionCache(directory, max_size=2*args.entries*RECORD.size)
+        start = time.perf_counter()
+        for key in keys:
+            cache.add(key, STATUS[True], b"\xff"*5, rng.randrange(100_000))
+        seconds = time.perf_counter() - start
+        print(f"Appended {args.entries:,} records at {args.entries/seconds:,.0f}/s")
+
+        start = time.perf_counter()
+        cache.close()
+        print(f"Wrote the index in {(time.perf_counter() - start)*1000:.0f} ms")
+        start = time.perf_counter()
+        cache = PositionCache(directory, max_size=2*args.entries*RECORD.size)
+        print(f"Opened in {(time.perf_counter() - start)*1000:.1f} ms, "
+              f"data {cache.size/2**20:.1f} MiB, index {os.path.getsize(os.path.join(directory, INDEX))/2**20:.1f} MiB")
+
+        hits = iter(rng.choices(keys, k=args.lookups))
+        misses = iter(rng.getrandbits(64) for _ in range(args.lookups))
+        print(f"Lookup: hit {timed(lambda: cache.lookup(next(hits)), args.lookups):.2f} us, miss {timed(lambda: cache.lookup(next(misses)), args.lookups):.2f} us")
+
+        positions = [Position.from_seed(seed) for seed in range(1000)]
+        for position in positions:
+            cache.put(position, Result(True, 100, next(position.auto().moves(), None)))
+        sample = positions*(args.lookups//len(positions) + 1)
+        hashed, got = iter(sample), iter(sample)
+        print(f"Position hash {timed(lambda: position_hash(next(hashed)), args.lookups):.2f} us, "
+              f"get {timed(lambda: cache.get(next(got)), args.lookups):.2f} us")
+        position = positions[0].auto()
+        move = next(position.moves())
+        assert cache.get(positions[0]).move == move and encode_move(position, move) == encode_move(position, cache.get(positions[0]).move)
+
+        # Over the size cap, so compaction keeps the entries that took the
+        # most nodes to solve
+        cache.max_size = cache.size//2
+        start = time.perf_counter()
+        cache.compact()
+        print(f"Compacted to {len(cache):,} entries in {(time.perf_counter() - start)*1000:.0f} ms")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
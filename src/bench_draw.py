@@ -0,0 +1,59 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import statistics
+import time
+
+import pygame
+
+from main import App
+
+
+def bench(app, batched, frames):
+    app.game.batched = batched
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        app.game.draw(app.screen)
+        times.append((time.perf_counter() - start)*1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the frame cost of batched and per-card blits")
+    parser.add_argument("-n", "--frames", type=int, default=2000, help="frames to draw with each path")
+    parser.add_argument("-s", "--seed", type=int, default=1, help="seed of the deal to draw")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), help="window size to draw at")
+    parser.add_argument("--renderer", nargs="?", const="", metavar="DRIVER", help="draw with an SDL renderer")
+    args = parser.parse_args()
+
+    app = App(args.renderer, args.seed)
+    if args.size:
+        app.resize(args.size)
+    app.new_game()
+    app.game.cancel_animations()
+    app.game.animations.clear()
+
+    # Warm up the surface caches before timing
+    bench(app, True, 10)
+    bench(app, False, 10)
+
+    results = {}
+    for name, batched in (("per-card", False), ("batched", True)):
+        times = results[name] = bench(app, batched, args.frames)
+        print(f"{name}: mean {statistics.fmean(times):.4f} ms, median {statistics.median(times):.4f} ms")
+    print(f"Speedup: {statistics.fmean(results['per-card'])/statistics.fmean(results['batched']):.2f}x")
+
+    if args.renderer is None:
+        frames = []
+        for batched in (False, True):
+            app.screen.fill((0, 0, 0))
+            bench(app, batched, 1)
+            frames.append(pygame.image.tobytes(app.screen.surface, "RGB"))
+        print("Both paths draw the same frame" if frames[0] == frames[1] else "The paths draw DIFFERENT frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import random
+import time
+
+from card import Suit, Symbol
+from main import App
+from variant import DOUBLE_KLONDIKE, KLONDIKE, Variant
+
+FRAMES = 500
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start)/repeat*1000
+
+
+def settle(game):
+    while game.animations:
+        game.cancel_animations()
+        game.animations = {a for a in game.animations if not a.done}
+
+
+def bench_frames(app):
+    game = app.game
+    # Card faces are rendered the first time they're used
+    for card in game.deck:
+        card.asset
+    # The deal is animated one card at a time, so this times frames with
+    # cards in flight
+    dealing = []
+    while game.animations:
+        start = time.perf_counter()
+        game.update(20)
+        game.draw(app.screen)
+        dealing.append((time.perf_counter() - start)*1000)
+    return sum(dealing)/len(dealing), timed(lambda: game.draw(app.screen), FRAMES)
+
+
+def bench_hit_test(app, rng):
+    game = app.game
+    points = [(rng.uniform(0, app.variant.width), rng.uniform(0, app.variant.height)) for _ in range(1000)]
+    return timed(lambda: [game.clicked_stack(p) for p in points], 1)
+
+
+def bench_moves(app):
+    game = app.game
+
+    def move():
+        moves = game.moves.legal_moves
+        if moves:
+            game.move_cards(*moves[0])
+            settle(game)
+            game.undo()
+            settle(game)
+    return timed(move, 200)
+
+
+# Puts every card face up on the waste so that collect_all plays them all
+def bench_collect(app):
+    game = app.game
+    cards = sorted((c for s in game.stacks for c in s.cards), key=lambda c: (-c.rank, list(Suit).index(c.suit)))
+    for s in game.stacks:
+        s.cards.clear()
+        s.touch()
+    for c in cards:
+        c.flipped = False
+        c.surface = c.asset
+    game.waste.cards.extend(cards)
+    game.waste.touch()
+    game.waste.reset_pos()
+
+    start = time.perf_counter()
+    game.collect_all()
+    settle(game)
+    return (time.perf_counter() - start)*1000, game.won
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time frames and moves on boards with more and more cards")
+    parser.add_argument("-d", "--decks", type=int, nargs="*", default=[4, 8], help="deck counts of extra custom boards")
+    parser.add_argument("-s", "--seed", type=int, default=1, help="seed of the deals")
+    args = parser.parse_args()
+
+    variants = [KLONDIKE, DOUBLE_KLONDIKE]
+    for decks in args.decks:
+        # As many tableaus as fit the width of the foundations
+        variants.append(Variant(f"custom{decks}", decks, min(decks*len(Suit) + 3, int((2*decks*len(Suit)*len(Symbol))**.5) - 1)))
+
+    print(f"{'board':>10} {'cards':>6} {'deal frame':>11} {'frame':>9} {'1000 hits':>10} {'move+undo':>10} {'collect all':>12}")
+    rng = random.Random(args.seed)
+    for variant in variants:
+        app = App(None, args.seed, variant)
+        app.new_game()
+        deal, frame = bench_frames(app)
+        hits = bench_hit_test(app, rng)
+        move = bench_moves(app)
+        collect, won = bench_collect(app)
+        assert won
+        print(f"{variant.name:>10} {variant.cards:>6} {deal:>8.3f} ms {frame:>6.3f} ms {hits:>7.3f} ms {move:>7.3f} ms {collect:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+
+from svg import Parser, Rasterizer
+
+import assets
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "assets")
+# Default window size and the scales of common screen heights
+SCALES = (1, 1.5, 2)
+
+
+def svg_files(directory):
+    files = [file for file in os.listdir(directory) if file.endswith(".svg")]
+    files += [f"icons/{file}" for file in os.listdir(os.path.join(directory, "icons")) if file.endswith(".svg")]
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-rasterized asset bundle")
+    parser.add_argument("-s", "--scales", type=float, nargs="+", default=SCALES, help="scales to rasterize")
+    parser.add_argument("-d", "--dir", default=ASSETS_DIR, help="assets directory")
+    parser.add_argument("-o", "--output", help="bundle file (default: assets.bin in the assets directory)")
+    args = parser.parse_args()
+
+    rasterizer = Rasterizer()
+    blobs = []
+    for file in svg_files(args.dir):
+        with open(os.path.join(args.dir, file), "rb") as f:
+            data = f.read()
+        blobs.append((file, 0, 0, 0, data))
+
+        svg = Parser.parse_file(os.path.join(args.dir, file))
+        for scale in args.scales:
+            size = round(svg.width * scale), round(svg.height * scale)
+            blobs.append((file, scale, *size, bytes(rasterizer.rasterize(svg, *size, scale))))
+
+    names = [file.encode() for file, *_ in blobs]
+    offset = assets.BUNDLE_HEADER.size + sum(assets.BUNDLE_NAME.size + len(name) + assets.BUNDLE_ENTRY.size for name in names)
+    with open(args.output or os.path.join(args.dir, assets.BUNDLE), "wb") as out:
+        out.write(assets.BUNDLE_HEADER.pack(assets.BUNDLE_MAGIC, len(blobs)))
+        for name, (_, scale, width, height, data) in zip(names, blobs):
+            out.write(assets.BUNDLE_NAME.pack(len(name)) + name)
+            out.write(assets.BUNDLE_ENTRY.pack(scale, width, height, offset, len(data)))
+            offset += len(data)
+        for *_, data in blobs:
+            out.write(data)
+
+    print(f"{len(blobs)} entries, {offset/2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
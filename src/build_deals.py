@@ -0,0 +1,51 @@
+import argparse
+import os
+from multiprocessing import Pool
+
+import deals
+from solver import Position, solve
+
+DEALS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "assets", "deals")
+
+
+def check(args):
+    seed, max_nodes = args
+    result = solve(Position.from_seed(seed), max_nodes)
+    return seed, result.winnable, result.nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extend the index of winnable deals")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="number of seeds to check")
+    parser.add_argument("-s", "--start", type=int, help="first seed to check (default: after the last checked one)")
+    parser.add_argument("-m", "--max-nodes", type=int, default=20_000, help="solver budget per deal")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-d", "--dir", default=DEALS_DIR, help="index directory")
+    args = parser.parse_args()
+
+    known = {b: set(deals.read_seeds(args.dir, b)) for b in deals.BUCKETS}
+    indexed = set().union(*known.values())
+    # Indexes built before the next seed was saved only know their winnable seeds
+    checked = deals.read_next_seed(args.dir)
+    if checked is None:
+        checked = max(indexed, default=-1) + 1
+    start = args.start if args.start is not None else checked
+    seeds = [s for s in range(start, start + args.count) if s not in indexed]
+
+    found = {b: [] for b in deals.BUCKETS}
+    with Pool(args.jobs) as pool:
+        for i, (seed, winnable, nodes) in enumerate(pool.imap_unordered(check, ((s, args.max_nodes) for s in seeds), 8)):
+            if winnable:
+                found[deals.bucket_of(nodes)].append(seed)
+            print(f"{i+1}/{len(seeds)}", end="\r")
+
+    for bucket, seeds in found.items():
+        deals.append_seeds(args.dir, bucket, sorted(seeds))
+        print(f"{bucket}: +{len(seeds)} ({len(known[bucket]) + len(seeds)} total)")
+    # A run starting further on leaves a gap, so it doesn't move the next seed
+    if start <= checked:
+        deals.write_next_seed(args.dir, max(checked, start + args.count))
+
+
+if __name__ == "__main__":
+    main()
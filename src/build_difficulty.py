@@ -0,0 +1,88 @@
+import argparse
+import math
+import os
+import statistics
+import time
+from multiprocessing import Pool
+
+from deals import BUCKETS, bucket_of
+from difficulty import FEATURES, DifficultyModel, features, model_path, numpy
+from solver import Position, deal_order, solve
+
+DEALS_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "assets", "deals")
+
+
+def measure(args):
+    seed, max_nodes = args
+    result = solve(Position.from_seed(seed), max_nodes)
+    # Deals that can't be won, or not within the budget, count as the hardest
+    nodes = result.nodes if result.winnable else max_nodes
+    return features(deal_order(seed)), math.log1p(nodes), nodes
+
+
+# Least squares through the normal equations, the last weight is the bias
+def fit(rows, targets):
+    rows = [row + [1] for row in rows]
+    n = len(rows[0])
+    a = [[sum(r[i]*r[j] for r in rows) for j in range(n)] + [sum(r[i]*t for r, t in zip(rows, targets))] for i in range(n)]
+    for i in range(n):
+        pivot = max(range(i, n), key=lambda k: abs(a[k][i]))
+        a[i], a[pivot] = a[pivot], a[i]
+        for k in range(n):
+            if k != i and a[i][i]:
+                factor = a[k][i]/a[i][i]
+                a[k] = [x - factor*y for x, y in zip(a[k], a[i])]
+    weights = [a[i][n]/a[i][i] if a[i][i] else 0 for i in range(n)]
+    return weights[:-1], weights[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the deal difficulty model against solver effort")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="number of deals to solve")
+    parser.add_argument("-s", "--start", type=int, default=1_000_000, help="first seed")
+    parser.add_argument("-m", "--max-nodes", type=int, default=20_000, help="solver budget per deal")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-d", "--dir", default=DEALS_DIR, help="directory to write difficulty.json to")
+    parser.add_argument("--bench", type=int, default=100_000, help="seeds to score when timing the model")
+    args = parser.parse_args()
+
+    with Pool(args.jobs) as pool:
+        samples = []
+        for i, sample in enumerate(pool.imap_unordered(measure, ((s, args.max_nodes) for s in range(args.start, args.start + args.count)), 8)):
+            samples.append(sample)
+            print(f"{i+1}/{args.count}", end="\r")
+    rows, targets, nodes = zip(*samples)
+
+    weights, bias = fit(list(rows), targets)
+    model = DifficultyModel(weights, bias, [0, 0])
+    scores = [bias + sum(w*f for w, f in zip(weights, row)) for row in rows]
+    # Equal thirds of all deals
+    ordered = sorted(scores)
+    model.thresholds = [ordered[len(ordered)*i//len(BUCKETS)] for i in range(1, len(BUCKETS))]
+
+    correlation = statistics.correlation(scores, targets)
+    agreement = sum(model.level(s) == bucket_of(n) for s, n in zip(scores, nodes))/len(scores)
+    for name, weight in zip(FEATURES, weights):
+        print(f"{name:>24}: {weight:+.4f}")
+    print(f"Correlation with log solver nodes: {correlation:.3f}")
+    print(f"Same bucket as the solver effort: {agreement:.1%}")
+
+    path = model_path(args.dir)
+    model.save(path, samples=len(scores), max_nodes=args.max_nodes, correlation=correlation)
+    print(f"Wrote {path}")
+
+    start = time.perf_counter()
+    for seed in range(args.bench):
+        model.score_seed(seed)
+    seconds = time.perf_counter() - start
+    print(f"Scored {args.bench} seeds at {args.bench/seconds:,.0f}/s in one process")
+
+    decks = [deal_order(seed) for seed in range(min(args.bench, 10_000))]
+    start = time.perf_counter()
+    model.score_decks(decks)
+    seconds = time.perf_counter() - start
+    print(f"Scored shuffled decks at {len(decks)/seconds:,.0f}/s {'with' if numpy is not None else 'without'} numpy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+
+from solver import FOUNDATION, TABLEAU, TALON, Position, Result, solve, suit
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "solitaire")
+DATA = "positions.bin"
+INDEX = "positions.idx"
+LOCK = "positions.lock"
+DATA_MAGIC = b"SOLC"
+INDEX_MAGIC = b"SOLI"
+# Files from older versions are started over. Before 3, lost results came
+# from a search that skipped some moves
+VERSION = 3
+# Magic, version, generation. Every new or compacted data file gets a new
+# random generation, and an index only holds for the generation it was
+# written for
+DATA_HEADER = struct.Struct("<4sIQ")
+# Board hash, status, move, solver nodes
+RECORD = struct.Struct("<QB5sI")
+# Magic, version, data generation, data records covered, entries. The sorted
+# hashes follow, then the record number of each
+INDEX_HEADER = struct.Struct("<4sIQQQ")
+MAX_SIZE = 64*1024*1024
+# Share of the size cap kept by compaction, the positions that took the most
+# effort to solve are kept first
+KEEP = .5
+# Records appended since the index was written that make reopening write it again
+TAIL = 4096
+
+STATUS = {False: 0, True: 1, None: 2}
+WINNABLE = {v: k for k, v in STATUS.items()}
+# A move is stored by the cards it involves rather than by tableau index, so
+# it holds for every ordering of the tableaus
+NO_MOVE = b"\xff"*5
+EMPTY = 0xff
+
+
+# Canonical hash of a board: the tableaus are sorted the way Position.key
+# sorts them, so boards that only differ in the order of the tableaus match
+def position_hash(position: Position):
+    talon, tableaus, *stock = position.key
+    data = bytearray(talon)
+    for down, up in tableaus:
+        data += b"\xfe"
+        data += bytes(down)
+        data += b"\xfd"
+        data += bytes(up)
+    data += b"\xfc"
+    data += bytes(position.foundations)
+    # Draw count, waste size and redeals left (0xff for unlimited), for stock
+    # rules other than dealing one card at a time with unlimited redeals
+    if stock:
+        draw, waste, redeals = stock
+        data += bytes((0xfb, draw, waste, 0xff if redeals is None else redeals))
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+
+def encode_move(position: Position, move):
+    if move is None:
+        return NO_MOVE
+    src, index, amount, dst, target = move
+    if src == TABLEAU:
+        card = position.tableaus[index][1][-amount]
+    elif src == TALON:
+        card = position.talon[index]
+    else:
+        card = position.foundations[index]-1 << 2 | index
+    if dst == TABLEAU:
+        up = position.tableaus[target][1]
+        onto = up[-1] if up else EMPTY
+    else:
+        onto = target
+    return bytes((src, card, amount, dst, onto))
+
+
+def decode_move(position: Position, data):
+    if data == NO_MOVE:
+        return None
+    src, card, amount, dst, onto = data
+    if src == TABLEAU:
+        index = next((i for i, (_, up) in enumerate(position.tableaus) if card in up), None)
+    elif src == TALON:
+        index = position.talon.index(card) if card in position.talon else None
+    else:
+        index = suit(card)
+    if dst == TABLEAU:
+        target = next((i for i, (down, up) in enumerate(position.tableaus) if (up[-1] == onto if up else not down and onto == EMPTY)), None)
+    else:
+        target = onto
+    if index is None or target is None:
+        return None
+    return src, index, amount, dst, target
+
+
+def new_generation():
+    return int.from_bytes(os.urandom(8), "little")
+
+
+# Solver results by board hash. Records are only ever appended to the data
+# file, a later record for the same board replaces the earlier one. The index
+# is a memory-mapped sorted array of hashes, records added since it was
+# written are kept in a dict until it's written again. One process at a time
+# can use a directory, the others get an OSError
+class PositionCache():
+    def __init__(self, directory=CACHE_DIR, max_size=MAX_SIZE):
+        super().__init__()
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, DATA)
+        self.index_path = os.path.join(directory, INDEX)
+        self.hits = 0
+        self.misses = 0
+        self.lock = self.acquire(os.path.join(directory, LOCK))
+        try:
+            self.open()
+        except BaseException:
+            self.lock.close()
+            raise
+
+    # region Files
+    @staticmethod
+    def acquire(path):
+        lock = open(path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                raise OSError(f"{os.path.dirname(path)} is in use by another process")
+        return lock
+
+    def open(self):
+        header = b""
+        if os.path.exists(self.data_path):
+            with open(self.data_path, "rb") as file:
+                header = file.read(DATA_HEADER.size)
+        # Missing, cut short, or left by an older version, which starts over
+        if len(header) < DATA_HEADER.size or (header[:4] == DATA_MAGIC and DATA_HEADER.unpack(header)[1] != VERSION):
+            with open(self.data_path, "wb") as file:
+                file.write(DATA_HEADER.pack(DATA_MAGIC, VERSION, new_generation()))
+        self.file = open(self.data_path, "ab")
+        # A record cut short by a crash is dropped
+        self.records = (os.path.getsize(self.data_path) - DATA_HEADER.size)//RECORD.size
+        self.file.truncate(self.size)
+        self.map_data()
+
+        self.load_index()
+        # New hash: (record number, status, move, nodes)
+        self.recent: dict[int, tuple] = {}
+        for number in range(self.covered, self.records):
+            key, *record = RECORD.unpack_from(self.data, DATA_HEADER.size + number*RECORD.size)
+            self.recent[key] = number, *record
+        if len(self.recent) >= TAIL:
+            self.write_index()
+
+    def map_data(self):
+        with open(self.data_path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation = DATA_HEADER.unpack_from(self.data)
+        if magic != DATA_MAGIC or version != VERSION:
+            raise ValueError(f"{self.data_path} is not a position cache")
+
+    def load_index(self):
+        self.index = None
+        self.keys, self.numbers, self.covered = (), (), 0
+        try:
+            with open(self.index_path, "rb") as file:
+                self.index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # Missing, or empty and so can't be mapped
+            return
+        magic, version, generation, covered, count = INDEX_HEADER.unpack_from(self.index)
+        if magic != INDEX_MAGIC or version != VERSION or generation != self.generation or covered > self.records:
+            # Written for other data, every record is read again instead
+            self.index.close()
+            self.index = None
+            return
+        view = memoryview(self.index)
+        start = INDEX_HEADER.size
+        self.keys = view[start:start + count*8].cast("Q")
+        self.numbers = view[start + count*8:start + count*12].cast("I")
+        self.covered = covered
+
+    # Merges the recent records into the index
+    def write_index(self):
+        entries = dict(zip(self.keys, self.numbers))
+        entries.update((key, record[0]) for key, record in self.recent.items())
+        keys = sorted(entries)
+        self.replace_index(keys, [entries[k] for k in keys], self.records)
+        self.recent.clear()
+        # The index now points past what was mapped
+        if len(self.data) < self.size:
+            self.data.close()
+            self.map_data()
+
+    def replace_index(self, keys, numbers, covered):
+        # The views have to go before the map can be closed
+        self.keys, self.numbers = (), ()
+        if self.index is not None:
+            self.index.close()
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION, self.generation, covered, len(keys)))
+            # Native byte order, like the casts that read them
+            file.write(array("Q", keys).tobytes())
+            file.write(array("I", numbers).tobytes())
+        os.replace(temporary, self.index_path)
+        self.load_index()
+
+    def close(self):
+        self.file.flush()
+        if self.recent:
+            self.write_index()
+        self.keys, self.numbers = (), ()
+        if self.index is not None:
+            self.index.close()
+        self.data.close()
+        self.file.close()
+        self.lock.close()
+    # endregion
+
+    # region Records
+    def __len__(self):
+        return len(self.keys) + sum(1 for key in self.recent if self.find(key) is None)
+
+    @property
+    def size(self):
+        return DATA_HEADER.size + self.records*RECORD.size
+
+    # Record number of a hash in the index
+    def find(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.numbers[i]
+        return None
+
+    # (status, move, nodes) of a hash
+    def lookup(self, key):
+        record = self.recent.get(key)
+        if record is not None:
+            return record[1:]
+        number = self.find(key)
+        if number is None or number >= self.records:
+            return None
+        record = RECORD.unpack_from(self.data, DATA_HEADER.size + number*RECORD.size)
+        # An index that doesn't match the data is a miss, never another board
+        if record[0] != key:
+            return None
+        return record[1:]
+
+    def add(self, key, status, move, nodes):
+        if self.size + RECORD.size > self.max_size:
+            self.compact()
+        self.file.write(RECORD.pack(key, status, move, nodes))
+        # Another process may read the file before this one closes it
+        self.file.flush()
+        self.recent[key] = self.records, status, move, nodes
+        self.records += 1
+
+    # Rewrites the data with only the latest record of each board, and only
+    # as many of them as fit in part of the size cap
+    def compact(self):
+        live = {}
+        for key, number in zip(self.keys, self.numbers):
+            live[key] = RECORD.unpack_from(self.data, DATA_HEADER.size + number*RECORD.size)[1:]
+        live.update((key, record[1:]) for key, record in self.recent.items())
+        keys = sorted(live)
+        room = int(self.max_size*KEEP - DATA_HEADER.size)//RECORD.size
+        if len(keys) > room:
+            keys = sorted(sorted(keys, key=lambda k: -live[k][2])[:room])
+
+        self.file.close()
+        self.keys, self.numbers = (), ()
+        self.data.close()
+        temporary = self.data_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(DATA_HEADER.pack(DATA_MAGIC, VERSION, new_generation()))
+            file.write(b"".join(RECORD.pack(key, *live[key]) for key in keys))
+        os.replace(temporary, self.data_path)
+        self.map_data()
+        self.records = len(keys)
+        self.file = open(self.data_path, "ab")
+        self.recent = {}
+        self.replace_index(keys, range(len(keys)), len(keys))
+    # endregion
+
+    # region Positions
+    # A result found with fewer nodes than asked for still holds, running out
+    # of a smaller budget doesn't
+    def get(self, position: Position, max_nodes=None) -> Result:
+        record = self.lookup(position_hash(position))
+        if record is None or (record[0] == STATUS[None] and max_nodes is not None and record[2] < max_nodes):
+            self.misses += 1
+            return None
+        self.hits += 1
+        status, move, nodes = record
+        # The solver's moves are made on the board after its safe moves
+        return Result(WINNABLE[status], nodes, decode_move(position.auto(), move) if move != NO_MOVE else None)
+
+    def put(self, position: Position, result: Result):
+        self.add(position_hash(position), STATUS[result.winnable], encode_move(position.auto(), result.move), result.nodes)
+
+    # Searches are only stored when they finished or ran out of nodes, not
+    # when they were cut short by time or cancelled
+    def solve(self, position: Position, max_nodes=200_000, time_limit=None, cancelled=None) -> Result:
+        result = self.get(position, max_nodes)
+        if result is not None:
+            return result
+        result = solve(position, max_nodes, time_limit, cancelled)
+        if result.winnable is not None or result.nodes > max_nodes:
+            self.put(position, result)
+        return result
+    # endregion
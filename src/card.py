@@ -13,11 +13,11 @@ class Suit(Enum):
 
     @property
     def is_red(self):
-        return self in {Suit.HEARTS, Suit.DIAMONDS}
+        return self in RED_SUITS
 
     @property
     def is_black(self):
-        return not self.is_red
+        return self not in RED_SUITS
 
 
 class Symbol(Enum):
@@ -36,43 +36,108 @@ class Symbol(Enum):
     KING = "k"
 
     @property
-    def _list(self):
-        return [s for s in Symbol]
+    def rank(self):
+        return RANKS[self]
 
     def is_next(self, other):
-        l = self._list
-        return l.index(self) == l.index(other)+1
+        return RANKS[self] == RANKS[other]+1
 
     def is_previous(self, other):
-        l = self._list
-        return l.index(self)+1 == l.index(other)
+        return RANKS[self]+1 == RANKS[other]
 
 
-class Card():
-    def __init__(self, app, suit: Suit, symbol: Symbol):
+RED_SUITS = frozenset((Suit.HEARTS, Suit.DIAMONDS))
+RANKS = {symbol: i for i, symbol in enumerate(Symbol)}
+
+
+# What never changes about a card, shared by the cards of every game
+class Face():
+    __slots__ = ("suit", "symbol", "rank", "is_red", "index", "asset_key")
+
+    def __init__(self, suit: Suit, symbol: Symbol, index):
         super().__init__()
-        self.app = app
         self.suit = suit
         self.symbol = symbol
+        self.rank = RANKS[symbol]
+        self.is_red = suit in RED_SUITS
+        # symbol*4 + suit, the encoding the solver uses
+        self.index = index
+        self.asset_key = suit, symbol
+
+
+FACES = {(suit, symbol): Face(suit, symbol, i*len(Suit) + j) for i, symbol in enumerate(Symbol) for j, suit in enumerate(Suit)}
+
+
+class Card():
+    __slots__ = ("view", "face", "flipped", "pos", "surface", "width_scale", "dest", "dest_pos", "dest_layout")
+
+    def __init__(self, view, suit: Suit, symbol: Symbol):
+        super().__init__()
+        self.view = view
+        self.face = FACES[suit, symbol]
         self.flipped = True
         self.pos = (0, 0)
-        self.surface: pygame.Surface = self.back_asset
+        # Picked from the assets when drawn, so headless games never load them
+        self.surface: pygame.Surface = None
+        # Horizontal scale of the surface, used when flipping
+        self.width_scale = 1
+        # Screen position cached for the layout and position it was computed for
+        self.dest = None
+        self.dest_pos = None
+        self.dest_layout = None
+
+    @property
+    def suit(self):
+        return self.face.suit
+
+    @property
+    def symbol(self):
+        return self.face.symbol
+
+    @property
+    def rank(self):
+        return self.face.rank
+
+    @property
+    def is_red(self):
+        return self.face.is_red
 
     @property
     def asset(self) -> pygame.Surface:
-        return assets.card_surfaces[(self.suit, self.symbol)]
+        return assets.card_surfaces[self.face.asset_key]
 
     @property
     def back_asset(self) -> pygame.Surface:
-        return assets.back_surface
+        return assets.get_back_surface()
 
-    def draw(self, screen):
-        if self.surface.get_height() != self.back_asset.get_height():
+    # The assets are rendered again when the window is resized
+    def refresh_surface(self):
+        if self.surface is None or self.surface.get_height() != self.back_asset.get_height():
             self.surface = self.back_asset if self.flipped else self.asset
+        return self.surface
+
+    # (surface, dest) for Surface.blits, only converted to screen coordinates
+    # again when the card moves or the window is resized
+    def blit_item(self):
+        if self.surface is None:
+            self.refresh_surface()
+        if self.pos is not self.dest_pos or self.dest_layout != self.view.layout:
+            if self.dest_layout != self.view.layout:
+                self.refresh_surface()
+            self.dest_pos, self.dest_layout = self.pos, self.view.layout
+            self.dest = self.view.game_to_screen(self.pos)
+        return self.surface, self.dest
 
-        pos = self.app.game_to_screen(self.pos)
-        pos = pos[0] + (self.back_asset.get_width() - self.surface.get_width())*.5, pos[1]
-        screen.blit(self.surface, pos)
+    def draw(self, screen):
+        self.refresh_surface()
+        pos = self.view.game_to_screen(self.pos)
+        if self.width_scale == 1:
+            screen.blit(self.surface, pos)
+            return
+
+        size = round(self.surface.get_width()*self.width_scale), self.surface.get_height()
+        pos = pos[0] + (self.back_asset.get_width() - size[0])*.5, pos[1]
+        screen.blit_scaled(self.surface, pos, size)
 
     def flip(self):
         self.flipped = not self.flipped
@@ -0,0 +1,102 @@
+import multiprocessing
+from enum import Enum, auto
+from queue import Empty
+
+from cache import PositionCache
+from observer import Change
+from solver import Position, solve
+
+TIME_LIMIT = 2
+MAX_NODES = 1_000_000
+
+
+class Winnable(Enum):
+    CHECKING = auto()
+    WINNABLE = auto()
+    UNKNOWN = auto()
+    LOST = auto()
+
+
+RESULTS = {True: Winnable.WINNABLE, None: Winnable.UNKNOWN, False: Winnable.LOST}
+
+
+def worker(requests, results, generation, directory):
+    # Results are kept across sessions. The cache is locked while it's open,
+    # so a second window's checker goes without it
+    positions = None
+    if directory is not None:
+        try:
+            positions = PositionCache(directory)
+        except (OSError, ValueError) as e:
+            print(f"Position cache not available: {e}")
+
+    while True:
+        request, key, position = requests.get()
+        cancelled = lambda: generation.value != request
+        if positions is not None:
+            result = positions.solve(position, MAX_NODES, TIME_LIMIT, cancelled)
+        else:
+            result = solve(position, MAX_NODES, TIME_LIMIT, cancelled)
+        if generation.value == request:
+            results.put((key, RESULTS[result.winnable]))
+
+
+# Checks whether the game can still be won in a background process, a newer
+# position cancels the check that's running
+class WinnableChecker():
+    def __init__(self, directory=None):
+        super().__init__()
+        # A forked child would share SDL's state, including its signal handlers
+        context = multiprocessing.get_context("spawn")
+        self.requests, self.results = context.Queue(), context.Queue()
+        self.generation = context.Value("q", 0, lock=False)
+        self.process = context.Process(target=worker, args=(self.requests, self.results, self.generation, directory), name="winnable", daemon=True)
+        self.process.start()
+        self.cache: dict[tuple, Winnable] = {}
+        self.key = None
+        # Position the last check gave up on. Unlike the other results it's
+        # not cached, so it's checked again the next time it comes up
+        self.unknown = None
+        self.settled = False
+        self.game = None
+
+    @property
+    def status(self):
+        if self.key is not None and self.key == self.unknown:
+            return Winnable.UNKNOWN
+        return self.cache.get(self.key, Winnable.CHECKING)
+
+    def watch(self, game):
+        if self.game is not None:
+            self.game.history.unsubscribe(Change.HISTORY, self.on_history_changed)
+        self.game = game
+        game.history.subscribe(Change.HISTORY, self.on_history_changed)
+        self.on_history_changed()
+
+    def on_history_changed(self):
+        self.generation.value += 1
+        # Good enough to show a cached result straight away
+        self.key = Position.from_game(self.game).key
+        self.unknown = None
+        self.settled = False
+
+    # Called every frame, never blocks
+    def update(self, game):
+        # Sequential moves are applied while they're animated, so only check
+        # the position once they're done
+        if not self.settled and all(a.done for a in game.animations):
+            position = Position.from_game(game)
+            self.key = position.key
+            self.settled = True
+            if self.key not in self.cache:
+                self.requests.put((self.generation.value, self.key, position))
+
+        try:
+            while True:
+                key, status = self.results.get_nowait()
+                if status == Winnable.UNKNOWN:
+                    self.unknown = key
+                else:
+                    self.cache[key] = status
+        except Empty:
+            pass
@@ -0,0 +1,86 @@
+import mmap
+import os
+import struct
+from random import randrange
+
+# Seeds are stored as little endian uint32s, one file per bucket
+SEED = struct.Struct("<I")
+BUCKETS = ("easy", "medium", "hard")
+# Solver nodes needed to win a deal, upper bound of each bucket but the last
+BUCKET_NODES = (100, 2000)
+# Seed after the last one build_deals.py checked, won or not
+NEXT_SEED = "next_seed"
+
+
+def bucket_of(nodes):
+    for bucket, limit in zip(BUCKETS, BUCKET_NODES):
+        if nodes < limit:
+            return bucket
+    return BUCKETS[-1]
+
+
+def bucket_path(directory, bucket):
+    return os.path.join(directory, f"{bucket}.bin")
+
+
+def read_seeds(directory, bucket):
+    try:
+        with open(bucket_path(directory, bucket), "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    return [s for s, in SEED.iter_unpack(data[:len(data) - len(data) % SEED.size])]
+
+
+def append_seeds(directory, bucket, seeds):
+    os.makedirs(directory, exist_ok=True)
+    with open(bucket_path(directory, bucket), "ab") as file:
+        file.write(b"".join(SEED.pack(s) for s in seeds))
+
+
+def read_next_seed(directory):
+    try:
+        with open(os.path.join(directory, NEXT_SEED), "rb") as file:
+            return SEED.unpack(file.read(SEED.size))[0]
+    except (FileNotFoundError, struct.error):
+        return None
+
+
+def write_next_seed(directory, seed):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, NEXT_SEED)
+    with open(path + ".tmp", "wb") as file:
+        file.write(SEED.pack(seed))
+    os.replace(path + ".tmp", path)
+
+
+class DealIndex():
+    def __init__(self, directory):
+        super().__init__()
+        self.maps: dict[str, mmap.mmap] = {}
+        for bucket in BUCKETS:
+            try:
+                with open(bucket_path(directory, bucket), "rb") as file:
+                    if os.fstat(file.fileno()).st_size >= SEED.size:
+                        self.maps[bucket] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                pass
+
+    def count(self, bucket=None):
+        if bucket is not None:
+            return len(self.maps[bucket])//SEED.size if bucket in self.maps else 0
+        return sum(self.count(b) for b in BUCKETS)
+
+    def random_seed(self, bucket=None):
+        buckets = BUCKETS if bucket is None else (bucket,)
+        i = randrange(sum(self.count(b) for b in buckets) or 1)
+        for b in buckets:
+            if i < self.count(b):
+                return SEED.unpack_from(self.maps[b], i*SEED.size)[0]
+            i -= self.count(b)
+        return None
+
+    def close(self):
+        for m in self.maps.values():
+            m.close()
+        self.maps.clear()
@@ -0,0 +1,116 @@
+import json
+import os
+from random import randrange
+
+from deals import BUCKETS
+from solver import DECK_SIZE, deal_order, rank
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TABLEAUS = 7
+FEATURES = ("buried aces", "buried twos", "face down low cards", "kings above cards", "late low cards in stock", "face up low cards")
+# Seeds tried to find a deal of the asked difficulty before giving up
+TRIES = 1000
+
+
+# Where each card of a shuffled deck ends up after the deal: (tableau, cards
+# above it) for the tableaus and (None, cards dealt before it) for the stock.
+# The deal pops cards off the end of the deck, like Position.from_seed
+def layout():
+    positions = [None]*DECK_SIZE
+    index = DECK_SIZE
+    for i in range(TABLEAUS):
+        for j in range(i+1):
+            index -= 1
+            positions[index] = i, i-j
+    for k in range(index):
+        positions[k] = None, index-1-k
+    return positions
+
+
+# One table per feature of what each card adds to it at each deck position,
+# so every feature of a deck is a sum of lookups
+def feature_tables():
+    positions = layout()
+    stock = sum(tableau is None for tableau, _ in positions)
+    tables = [[[0.0]*DECK_SIZE for _ in range(DECK_SIZE)] for _ in FEATURES]
+    for pos, (tableau, depth) in enumerate(positions):
+        for card in range(DECK_SIZE):
+            r = rank(card)
+            if tableau is None:
+                tables[4][pos][card] = depth/(stock-1) if r <= 1 else 0
+                continue
+            tables[0][pos][card] = depth if r == 0 else 0
+            tables[1][pos][card] = depth if r == 1 else 0
+            tables[2][pos][card] = 1 if r <= 3 and depth else 0
+            tables[3][pos][card] = 1 if r == 12 and depth < tableau else 0
+            tables[5][pos][card] = 1 if r <= 1 and not depth else 0
+    return tables
+
+
+TABLES = feature_tables()
+
+
+def features(deck):
+    return [sum(map(list.__getitem__, table, deck)) for table in TABLES]
+
+
+# Linear model of the log of the solver effort a deal needs, from features
+# that are cheap to compute from the shuffled deck
+class DifficultyModel():
+    def __init__(self, weights, bias, thresholds):
+        super().__init__()
+        self.weights = weights
+        self.bias = bias
+        # Scores splitting easy from medium and medium from hard
+        self.thresholds = thresholds
+        # The features folded into one table
+        self.table = [[sum(w*t[pos][card] for w, t in zip(weights, TABLES)) for card in range(DECK_SIZE)] for pos in range(DECK_SIZE)]
+        self.array = numpy.array(self.table) if numpy is not None else None
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            # Uncalibrated, but orders deals sensibly
+            return cls([1, .5, .5, .5, .5, -1], 0, [4, 8])
+        return cls(data["weights"], data["bias"], data["thresholds"])
+
+    def save(self, path, **info):
+        with open(path, "w") as file:
+            json.dump({"features": FEATURES, "weights": self.weights, "bias": self.bias, "thresholds": self.thresholds, **info}, file, indent=2)
+
+    def score_deck(self, deck):
+        return self.bias + sum(map(list.__getitem__, self.table, deck))
+
+    def score_seed(self, seed):
+        return self.score_deck(deal_order(seed))
+
+    # Scores an (N, 52) array of decks at once, or a list of decks without numpy
+    def score_decks(self, decks):
+        if self.array is None:
+            return [self.score_deck(deck) for deck in decks]
+        decks = numpy.asarray(decks)
+        return self.bias + self.array[numpy.arange(DECK_SIZE), decks].sum(axis=1)
+
+    def level(self, score):
+        for bucket, limit in zip(BUCKETS, self.thresholds):
+            if score < limit:
+                return bucket
+        return BUCKETS[-1]
+
+    def random_seed(self, level):
+        for _ in range(TRIES):
+            seed = randrange(2**32)
+            if self.level(self.score_seed(seed)) == level:
+                return seed
+        return None
+
+
+def model_path(directory):
+    return os.path.join(directory, "difficulty.json")
@@ -0,0 +1,350 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+# SDL turns SIGTERM into a quit event, which would keep the pool's workers alive
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import argparse
+import json
+import sys
+import time
+from enum import Enum
+from multiprocessing import Pool
+from random import Random
+
+import pygame
+
+import assets
+import constants
+from card import RANKS, Symbol
+from game import Game
+from variant import KLONDIKE, VARIANTS, Variant
+from view import View
+
+ACE = RANKS[Symbol.ACE]
+
+
+class Op(Enum):
+    DEAL = "deal"
+    COLLECT = "collect"
+    COLLECT_ALL = "collect_all"
+    MOVE = "move"
+    DRAG = "drag"
+    UNDO = "undo"
+    REDO = "redo"
+    TICK = "tick"
+    CANCEL = "cancel"
+
+
+# How often each action is picked
+WEIGHTS = {
+    Op.MOVE: 30,
+    Op.DRAG: 15,
+    Op.DEAL: 15,
+    Op.UNDO: 12,
+    Op.REDO: 6,
+    Op.TICK: 10,
+    Op.CANCEL: 5,
+    Op.COLLECT: 4,
+    Op.COLLECT_ALL: 3,
+}
+OPS = tuple(WEIGHTS)
+CUMULATIVE = tuple(sum(list(WEIGHTS.values())[:i+1]) for i in range(len(WEIGHTS)))
+
+
+class Violation(Exception):
+    def __init__(self, invariant, step, detail=""):
+        super().__init__(f"{invariant} after step {step}{': ' if detail else ''}{detail}")
+        self.invariant = invariant
+        self.step = step
+
+
+# Stacks are referred to by their index in game.clickable_stacks, so an action
+# (Op, *ints) means the same thing in any game and can be saved and replayed
+def random_action(game: Game, rng: Random):
+    op = rng.choices(OPS, cum_weights=CUMULATIVE)[0]
+    stacks = game.clickable_stacks
+    if op == Op.MOVE:
+        moves = game.moves.legal_moves
+        if moves:
+            s, t, amount = rng.choice(moves)
+            return op, stacks.index(s), stacks.index(t), amount
+        op = Op.DEAL
+    if op == Op.DRAG:
+        return op, rng.randrange(len(stacks)), rng.randint(1, 13), rng.randrange(len(stacks))
+    if op == Op.COLLECT:
+        return op, rng.randrange(len(stacks))
+    if op == Op.TICK:
+        return op, rng.randint(1, 2*constants.ANIMATION_LENGTH)
+    return op,
+
+
+# Returns whether the action could be taken. The ones that can't are skipped,
+# which keeps any part of a sequence replayable
+def apply(game: Game, action):
+    op, *args = action
+    stacks = game.clickable_stacks
+    if op == Op.DEAL:
+        if not game.moves.can_deal:
+            return False
+        game.deal_card()
+    elif op == Op.COLLECT:
+        # A middle click, which collects everything when it isn't on a card
+        x, y = top_pos(stacks[args[0]])
+        game.on_mouseclick_m((x + 2, y + 2))
+    elif op == Op.COLLECT_ALL:
+        game.collect_all()
+    elif op == Op.MOVE:
+        # Pending animations can still change the board
+        game.cancel_animations()
+        move = stacks[args[0]], stacks[args[1]], args[2]
+        if move not in game.moves.legal_moves:
+            return False
+        game.move_cards(*move)
+    elif op == Op.DRAG:
+        return drag(game, *args)
+    elif op == Op.UNDO:
+        if not game.history.past:
+            return False
+        game.undo()
+    elif op == Op.REDO:
+        if not game.history.future:
+            return False
+        game.redo()
+    elif op == Op.TICK:
+        game.update(args[0])
+    else:
+        game.cancel_animations()
+    return True
+
+
+# Goes through the mouse handlers like a player would, so drops on stacks that
+# can't take the cards are part of it
+def drag(game: Game, source, amount, target):
+    game.cancel_animations()
+    stack = game.clickable_stacks[source]
+    if amount > stack.size:
+        return False
+    x, y = list(zip(stack.cards, stack.get_card_pos()))[-amount][1]
+    game.on_mousedragbegin_l((x + 2, y + 2))
+    if game.drag.is_empty:
+        return False
+    pos = game.clickable_stacks[target].rect.center
+    game.on_mousedrag_l(pos)
+    game.on_mousedragend_l(pos)
+    return True
+
+
+def top_pos(stack):
+    positions = [pos for _, pos in zip(stack.cards, stack.get_card_pos())]
+    return positions[-1] if positions else stack.pos
+
+
+def settled(game: Game):
+    return all(a.done for a in game.animations)
+
+
+def check(game: Game, cards, step):
+    every = [c for s in game.stacks for c in s.cards]
+    if len(every) != len(cards) or {id(c) for c in every} != cards:
+        raise Violation("cards conserved", step, f"{len(every)} cards on the board")
+    if not game.drag.is_empty:
+        raise Violation("drag stack empty", step)
+
+    if any(not c.flipped for c in game.stock.cards):
+        raise Violation("stock face down", step)
+    if any(c.flipped for c in game.waste.cards):
+        raise Violation("waste face up", step)
+
+    for i, tableau in enumerate(game.tableaus):
+        pile = tableau.cards
+        down = 0
+        while down < len(pile) and pile[down].flipped:
+            down += 1
+        if any(c.flipped for c in pile[down:]):
+            raise Violation("face down cards only under face up ones", step, f"tableau {i}")
+        # The card on top is flipped along with the move that uncovers it
+        if down and down == len(pile) and settled(game):
+            raise Violation("face up card on top", step, f"tableau {i}")
+        for upper, lower in zip(pile[down:], pile[down+1:]):
+            if upper.is_red == lower.is_red or upper.rank != lower.rank+1:
+                raise Violation("tableau runs alternate and descend", step, f"tableau {i}")
+
+    for i, foundation in enumerate(game.foundations):
+        for rank, card in enumerate(foundation.cards, ACE):
+            if card.flipped or card.rank != rank or card.suit is not foundation.cards[0].suit:
+                raise Violation("foundations ordered", step, f"foundation {i}")
+
+
+# Undoes every move, compares the board to the deal, then redoes them and
+# compares it to where it was
+def rewind(game: Game, deal, step):
+    game.cancel_animations()
+    now = game.snapshot()
+    redeals = game.stock.redeals
+    moves = len(game.history.past)
+    for _ in range(moves):
+        game.undo()
+    game.cancel_animations()
+    if game.snapshot() != deal or game.stock.redeals:
+        raise Violation("undo all restores the deal", step)
+    check_positions(game, step)
+
+    for _ in range(moves):
+        game.redo()
+    game.cancel_animations()
+    if game.snapshot() != now or game.stock.redeals != redeals:
+        raise Violation("redo all restores the board", step)
+    check_positions(game, step)
+
+
+# Every card ends up where its stack lays it out once the animations are done
+def check_positions(game: Game, step):
+    for stack in game.clickable_stacks:
+        if any(c.pos != pos for c, pos in zip(stack.cards, stack.get_card_pos())):
+            raise Violation("cards settle in place", step, type(stack).__name__)
+
+
+def new_game(seed, variant: Variant):
+    game = Game(View(), seed, variant)
+    cards = {id(c) for s in game.stacks for c in s.cards}
+    # The deal itself isn't in the history, so undoing everything ends here
+    dealt = Game(View(), seed, variant)
+    dealt.cancel_animations()
+    return game, cards, dealt.snapshot()
+
+
+# Plays random actions until one breaks an invariant or the budget is spent.
+# Returns the actions that were taken and the violation, if any
+def fuzz(seed, steps, variant: Variant, every):
+    rng = Random(seed)
+    game, cards, deal = new_game(seed, variant)
+    actions = []
+    try:
+        for step in range(steps):
+            action = random_action(game, rng)
+            actions.append(action)
+            apply(game, action)
+            check(game, cards, step)
+            if step % every == every-1:
+                rewind(game, deal, step)
+        rewind(game, deal, steps)
+    except Exception as e:
+        return actions, e
+    return actions, None
+
+
+# The same kind of failure, so shrinking doesn't wander to another bug
+def failure_key(error):
+    if error is None:
+        return None
+    return type(error).__name__, getattr(error, "invariant", None)
+
+
+# Returns the error and how many actions it took to get there
+def replay(seed, actions, variant: Variant):
+    game, cards, deal = new_game(seed, variant)
+    step = 0
+    try:
+        for step, action in enumerate(actions):
+            apply(game, action)
+            check(game, cards, step)
+        step = len(actions)
+        rewind(game, deal, step)
+    except Exception as e:
+        return e, step+1
+    return None, step
+
+
+# Removes ever smaller chunks of the sequence, keeping each removal that
+# still fails the same way. Whatever comes after the failure is cut off
+def shrink(seed, actions, key, variant: Variant):
+    size = len(actions)//2
+    while size:
+        start = 0
+        while start < len(actions):
+            candidate = actions[:start] + actions[start+size:]
+            error, end = replay(seed, candidate, variant)
+            if failure_key(error) == key:
+                actions = candidate[:end]
+            else:
+                start += size
+        size //= 2
+    return actions
+
+
+def setup():
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    assets.load_bundle()
+    assets.render_svgs(1)
+
+
+def run(args):
+    seed, steps, variant, every = args
+    start = time.perf_counter()
+    actions, error = fuzz(seed, steps, variant, every)
+    return seed, len(actions), time.perf_counter() - start, actions if error is not None else None, failure_key(error), repr(error)
+
+
+def encode(seed, variant: Variant, actions):
+    return json.dumps({"seed": seed, "variant": variant.to_dict(), "actions": [[op.value, *args] for op, *args in actions]})
+
+
+def decode(line):
+    data = json.loads(line)
+    return data["seed"], Variant(**data["variant"]), [(Op(op), *args) for op, *args in data["actions"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play random actions and undo/redo sequences, checking the board after every step")
+    parser.add_argument("-n", "--games", type=int, default=100, help="number of games")
+    parser.add_argument("-a", "--actions", type=int, default=10_000, help="actions per game")
+    parser.add_argument("-s", "--start", type=int, default=0, help="first seed")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-r", "--rewind", type=int, default=256, help="actions between undoing and redoing everything")
+    parser.add_argument("--variant", choices=VARIANTS, default=KLONDIKE.name, help="game to play")
+    parser.add_argument("-o", "--output", default="fuzz_failures.jsonl", help="file to write the shrunk failing sequences to")
+    parser.add_argument("--replay", metavar="FILE", help="replay the sequences in a failures file instead")
+    args = parser.parse_args()
+
+    setup()
+    if args.replay:
+        with open(args.replay) as file:
+            for line in file:
+                seed, variant, actions = decode(line)
+                print(f"seed {seed}, {len(actions)} actions: {replay(seed, actions, variant)[0]!r}")
+        return
+
+    variant = VARIANTS[args.variant]
+    tasks = [(seed, args.actions, variant, args.rewind) for seed in range(args.start, args.start + args.games)]
+    total = 0
+    busy = 0
+    failures = []
+    start = time.perf_counter()
+    with Pool(args.jobs, setup) as pool:
+        for i, (seed, steps, seconds, actions, key, error) in enumerate(pool.imap_unordered(run, tasks)):
+            total += steps
+            busy += seconds
+            if actions is not None:
+                failures.append((seed, actions, key, error))
+            print(f"{i+1}/{len(tasks)}, {total:,} actions, {len(failures)} failures", end="\r")
+    seconds = time.perf_counter() - start
+    print(f"\n{total:,} actions in {seconds:.1f} s: {total/seconds:,.0f} actions/s, {total/busy:,.0f} per process")
+
+    if not failures:
+        return
+    with open(args.output, "w") as file:
+        for seed, actions, key, error in failures:
+            shrunk = shrink(seed, actions, key, variant)
+            print(f"seed {seed}: {error}, shrunk from {len(actions)} to {len(shrunk)} actions")
+            for action in shrunk:
+                print("   ", action[0].value, *action[1:])
+            file.write(encode(seed, variant, shrunk) + "\n")
+    print(f"Wrote {args.output}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
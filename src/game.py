@@ -1,22 +1,28 @@
-from collections import deque
-from random import shuffle
+from random import Random, randrange
 
-import constants
 from animation import Animation
 from card import Card, Suit, Symbol
 from history import History
-from move import ConcurrentMoves, FlipMove, Move, MoveMove, SequentialMoves
+from move import ConcurrentMoves, FlipMove, Move, MoveMove, RedealMove, SequentialMoves
+from movegen import MoveGenerator
+from observer import Change, Observable
 from stack import DragStack, FoundationStack, Stack, StockStack, TableauStack, WasteStack
+from variant import KLONDIKE, Variant
 
 
-class Game():
-    def __init__(self, app):
+class Game(Observable):
+    def __init__(self, view, seed=None, variant: Variant = KLONDIKE):
         super().__init__()
-        self.app = app
+        self.view = view
+        self.variant = variant
+        self.won = False
+        # Submit all cards in one Surface.blits call instead of one blit each
+        self.batched = True
+        self.seed = randrange(2**32) if seed is None else seed
         self.history = History(self)
         self.animations: set[Animation] = set()
         self.deck = self.create_deck()
-        shuffle(self.deck)
+        Random(self.seed).shuffle(self.deck)
         self.setup_stacks()
         self.deal()
         self.paused = False
@@ -24,19 +30,29 @@ class Game():
 
     # region Commands
     def create_deck(self):
-        return deque(Card(self.app, suit, symbol) for symbol in Symbol for suit in Suit)
+        return [Card(self.view, suit, symbol) for _ in range(self.variant.decks) for symbol in Symbol for suit in Suit]
 
     def setup_stacks(self):
-        self.foundations = tuple(FoundationStack(self.app, (i*constants.CARD_WIDTH_MARGIN + constants.BIG_MARGIN, constants.BIG_MARGIN)) for i in range(4))
-        self.waste = WasteStack(self.app, (4*constants.CARD_WIDTH_MARGIN + constants.BIG_MARGIN, constants.BIG_MARGIN))
-        self.stock = StockStack(self.app, (6*constants.CARD_WIDTH_MARGIN + constants.BIG_MARGIN, constants.BIG_MARGIN))
-        self.tableaus = tuple(TableauStack(self.app, (i*constants.CARD_WIDTH_MARGIN + constants.BIG_MARGIN, constants.CARD_HEIGHT_MARGIN + constants.BIG_MARGIN)) for i in range(7))
-        self.drag = DragStack(self.app, (0, 0))
+        v = self.variant
+        self.foundations = tuple(FoundationStack(self.view, v.foundation_pos(i)) for i in range(v.foundations))
+        self.waste = WasteStack(self.view, v.waste_pos())
+        self.stock = StockStack(self.view, v.stock_pos())
+        self.tableaus = tuple(TableauStack(self.view, v.tableau_pos(i)) for i in range(v.tableaus))
+        self.drag = DragStack(self.view, (0, 0))
         self.clickable_stacks: tuple[Stack] = self.foundations + self.tableaus + (self.stock, self.waste)
         self.stacks: tuple[Stack] = (self.stock, self.waste) + tuple(reversed(self.tableaus)) + tuple(reversed(self.foundations)) + (self.drag,)
+        for stack in self.clickable_stacks:
+            stack.subscribe(Change.BOARD, self.on_stack_changed)
+        self.moves = MoveGenerator(self)
+
+    def on_stack_changed(self, stack: Stack):
+        if stack in self.foundations:
+            self.won = all(f.size == len(Symbol) for f in self.foundations)
+        self.publish(Change.BOARD, stack)
 
     def deal(self):
         self.stock.cards = self.deck
+        self.stock.touch()
         self.stock.reset_pos()
         moves = []
         k = 1
@@ -70,9 +86,26 @@ class Game():
 
         self.cancel_animations()
         if self.stock.is_empty:
-            self.history.add_move(ConcurrentMoves(tuple(FlipMove(c) for c in self.waste.cards) + (MoveMove(self.waste, self.stock, self.waste.size, True),)))
+            if not self.moves.can_deal:
+                return
+            self.history.add_move(ConcurrentMoves(tuple(FlipMove(c) for c in self.waste.cards) + (MoveMove(self.waste, self.stock, self.waste.size, True), RedealMove(self.stock))))
         else:
-            self.history.add_move(ConcurrentMoves((FlipMove(self.stock.card_on_top), MoveMove(self.stock, self.waste, 1))))
+            # Dealt one after the other, so the last one ends up on top
+            cards = self.stock.cards[-self.variant.draw:]
+            self.history.add_move(ConcurrentMoves(tuple(FlipMove(c) for c in cards) + (MoveMove(self.stock, self.waste, len(cards), True),)))
+
+    def _stack_move(self, from_stack: Stack, to_stack: Stack, amount) -> Move:
+        move = MoveMove(from_stack, to_stack, amount)
+        if from_stack in self.tableaus and from_stack.size > amount and from_stack.cards[-amount-1].flipped:
+            move = ConcurrentMoves((FlipMove(from_stack.cards[-amount-1]), move))
+        return move
+
+    def move_cards(self, from_stack: Stack, to_stack: Stack, amount):
+        if self.paused:
+            return
+
+        self.cancel_animations()
+        self.history.add_move(self._stack_move(from_stack, to_stack, amount))
 
     def _collect_card_move(self, stack: Stack, foundation: FoundationStack) -> Move:
         move = MoveMove(stack, foundation, 1)
@@ -81,12 +114,13 @@ class Game():
         return move
 
     def collect_card(self, stack: Stack):
+        # A lazily undone or redone move can still change the board
+        self.cancel_animations()
         if stack.is_empty:
             return
 
         for f in self.foundations:
             if f.can_enter(stack.card_on_top, 1):
-                self.cancel_animations()
                 self.history.add_move(self._collect_card_move(stack, f))
                 return
 
@@ -118,26 +152,53 @@ class Game():
 
         for animation in self.animations:
             animation.cancel()
+        # Otherwise they pile up until the next update, and every cancel
+        # goes through all of them again
+        self.animations.clear()
 
     def pause(self):
         self.paused = not self.paused
     # endregion
 
-    def draw(self, screen):
-        if not self.paused:
-            for animation in set(self.animations):
-                animation.tick(self.app.clock.get_time())
-                if animation.done:
-                    self.animations.remove(animation)
-
-            if not self.animations and all(f.size == 13 for f in self.foundations):
-                print("WIN")
-                self.app.game_win()
-            else:
-                self.time += self.app.clock.get_time()
+    def named_stacks(self) -> dict[str, Stack]:
+        stacks = {"stock": self.stock, "waste": self.waste}
+        stacks.update((f"foundation{i}", s) for i, s in enumerate(self.foundations))
+        stacks.update((f"tableau{i}", s) for i, s in enumerate(self.tableaus))
+        return stacks
+
+    def snapshot(self):
+        # Face down cards are marked with a trailing #
+        return {name: [f"{c.suit.value}_{c.symbol.value}{'#' if c.flipped else ''}" for c in s.cards] for name, s in self.named_stacks().items()}
 
+    # Advances the animations and the timer by the frame time
+    def update(self, time):
+        if self.paused:
+            return
+
+        for animation in set(self.animations):
+            animation.tick(time)
+            if animation.done:
+                self.animations.remove(animation)
+
+        if self.won and not self.animations:
+            print("WIN")
+            self.publish(Change.WIN)
+        else:
+            self.time += time
+
+    # Adds the board to a batch for Surface.blits, which several boards can share
+    def collect(self, blits, screen):
         for stack in self.stacks:
-            stack.draw(screen)
+            stack.collect(blits, screen)
+
+    def draw(self, screen):
+        if self.batched:
+            blits = []
+            self.collect(blits, screen)
+            screen.blits(blits)
+        else:
+            for stack in self.stacks:
+                stack.draw(screen)
 
     # region Mouse
     def clicked_stack(self, pos):
@@ -176,9 +237,7 @@ class Game():
             c = s.get_cards_to_drag(pos)
             if c:
                 self.cancel_animations()
-                self.drag.cards += list(s.cards)[s.size-c:]
-                self.drag.source_stack = s
-                self.drag.offset = (pos[0] - self.drag.cards[0].pos[0], pos[1] - self.drag.cards[0].pos[1])
+                self.drag.lift(s, c, pos)
 
     def on_mousedragend_l(self, pos):
         if self.paused:
@@ -187,14 +246,12 @@ class Game():
         if self.drag.is_empty:
             return
 
-        for s in self.stacks:
-            if s.rect.collidepoint(pos) and s.can_enter(self.drag.card_on_bottom, self.drag.size):
-                move = MoveMove(self.drag.source_stack, s, self.drag.size)
-                if self.drag.source_stack in self.tableaus and self.drag.source_stack.size > self.drag.size and self.drag.source_stack.cards[-self.drag.size-1].flipped:
-                    move = ConcurrentMoves((FlipMove(self.drag.source_stack.cards[-self.drag.size-1]), move))
-                self.history.add_move(move)
+        card, amount = self.drag.card_on_bottom, self.drag.size
+        source = self.drag.drop()
+        for s in self.clickable_stacks:
+            if s.rect.collidepoint(pos) and s.can_enter(card, amount):
+                self.history.add_move(self._stack_move(source, s, amount))
                 break
 
-        self.drag.cards.clear()
-        self.animations.add(self.drag.source_stack.animate())
+        self.animations.add(source.animate())
     # endregion
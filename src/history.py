@@ -1,9 +1,10 @@
 from collections import deque
 
 from move import Move
+from observer import Change, Observable
 
 
-class History():
+class History(Observable):
     def __init__(self, game):
         super().__init__()
         self.game = game
@@ -17,6 +18,7 @@ class History():
         move = self.past.pop()
         self.game.animations.add(move.undo())
         self.future.append(move)
+        self.publish(Change.HISTORY)
 
     def redo(self):
         if len(self.future) == 0:
@@ -25,8 +27,12 @@ class History():
         move = self.future.pop()
         self.game.animations.add(move.redo())
         self.past.append(move)
+        self.publish(Change.HISTORY)
 
     def add_move(self, move):
+        # Applied first, so a move that fails leaves the history as it was
+        animation = move.redo()
         self.past.append(move)
         self.future.clear()
-        self.game.animations.add(move.redo())
+        self.game.animations.add(animation)
+        self.publish(Change.HISTORY)
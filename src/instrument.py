@@ -0,0 +1,247 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+
+# The main loop ticks at 200 FPS
+FRAME_BUDGET = 5
+# Frames kept of each allocation's traceback, to get past library code to
+# the subsystem that called it
+TRACE_FRAMES = 8
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Subsystem of each source file, anything else is counted as other
+SUBSYSTEMS = {
+    "animation.py": "animation",
+    "move.py": "animation",
+    "history.py": "animation",
+    "stack.py": "stacks",
+    "card.py": "stacks",
+    "game.py": "stacks",
+    "movegen.py": "stacks",
+    "view.py": "stacks",
+    "ui.py": "ui",
+    "main.py": "ui",
+    "screen.py": "ui",
+    "assets.py": "assets",
+}
+OTHER = "other"
+
+
+class Frame():
+    def __init__(self, number, ms, animating, collections, gc_ms, blocks, sizes, peak):
+        super().__init__()
+        self.number = number
+        self.ms = ms
+        self.animating = animating
+        # Collections of each generation and the time spent in them
+        self.collections = collections
+        self.gc_ms = gc_ms
+        # Blocks the frame allocated and still held at its end, and their
+        # size, by subsystem
+        self.blocks: Counter = blocks
+        self.sizes: Counter = sizes
+        # Most memory the frame's allocations held at once, temporaries included
+        self.peak = peak
+
+    def to_dict(self):
+        return {"frame": self.number, "ms": round(self.ms, 3), "animating": self.animating, "collections": self.collections,
+                "gc_ms": round(self.gc_ms, 3), "blocks": dict(self.blocks), "bytes": dict(self.sizes), "peak": self.peak}
+
+
+# Counts what every frame allocates and how often the garbage collector runs
+# in it. The traces are cleared when a frame begins, so the snapshot at its end
+# only holds the blocks the frame allocated, which keeps snapshots cheap
+class FrameMonitor():
+    def __init__(self, budget=FRAME_BUDGET, trace=True):
+        super().__init__()
+        self.budget = budget
+        self.trace = trace
+        self.frames: list[Frame] = []
+        self.collections = [0]*3
+        self.gc_time = 0
+        self.gc_start = None
+        self.start = None
+        # Subsystem of each traceback seen
+        self.subsystems = {}
+
+    def install(self):
+        gc.callbacks.append(self.on_gc)
+        if self.trace:
+            tracemalloc.start(TRACE_FRAMES)
+
+    def uninstall(self):
+        gc.callbacks.remove(self.on_gc)
+        if self.trace:
+            tracemalloc.stop()
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            self.collections[info["generation"]] += 1
+            self.gc_time += time.perf_counter() - self.gc_start
+            self.gc_start = None
+
+    def subsystem(self, traceback):
+        subsystem = self.subsystems.get(traceback)
+        if subsystem is None:
+            subsystem = OTHER
+            # Most recent call last
+            for frame in reversed(traceback):
+                directory, name = os.path.split(frame.filename)
+                if directory == SOURCE_DIR and name in SUBSYSTEMS:
+                    subsystem = SUBSYSTEMS[name]
+                    break
+            self.subsystems[traceback] = subsystem
+        return subsystem
+
+    def begin(self):
+        self.collections = [0]*3
+        self.gc_time = 0
+        if self.trace:
+            tracemalloc.clear_traces()
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+
+    def end(self, animating=False):
+        ms = (time.perf_counter() - self.start)*1000
+        blocks, sizes, peak = Counter(), Counter(), 0
+        if self.trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            for trace in tracemalloc.take_snapshot().traces:
+                subsystem = self.subsystem(trace.traceback)
+                blocks[subsystem] += 1
+                sizes[subsystem] += trace.size
+        self.frames.append(Frame(len(self.frames), ms, animating, self.collections, self.gc_time*1000, blocks, sizes, peak))
+
+    # region Report
+    def over_budget(self):
+        return [f for f in self.frames if f.ms > self.budget]
+
+    def summary(self):
+        frames = self.frames
+        times = sorted(f.ms for f in frames)
+        over = self.over_budget()
+        subsystems = sorted(set(SUBSYSTEMS.values())) + [OTHER]
+        return {
+            "frames": len(frames),
+            "budget_ms": self.budget,
+            "mean_ms": statistics.fmean(times),
+            "p99_ms": times[min(len(times)-1, int(len(times)*.99))],
+            "over_budget": len(over),
+            "over_budget_with_gc": sum(any(f.collections) for f in over),
+            "collections": [sum(f.collections[g] for f in frames) for g in range(3)],
+            "gc_ms": sum(f.gc_ms for f in frames),
+            "max_gc_ms": max(f.gc_ms for f in frames),
+            # Means per frame
+            "blocks": {s: statistics.fmean(f.blocks[s] for f in frames) for s in subsystems},
+            "bytes": {s: statistics.fmean(f.sizes[s] for f in frames) for s in subsystems},
+            "animating_peak": statistics.fmean([f.peak for f in frames if f.animating] or [0]),
+            "idle_peak": statistics.fmean([f.peak for f in frames if not f.animating] or [0]),
+        }
+
+    def report(self):
+        if not self.frames:
+            return
+        s = self.summary()
+        print(f"Frames: {s['frames']}, mean {s['mean_ms']:.3f} ms, p99 {s['p99_ms']:.3f} ms")
+        print(f"Over {s['budget_ms']} ms: {s['over_budget']}, {s['over_budget_with_gc']} of them with a collection")
+        print(f"Collections: {', '.join(f'gen{g} {n}' for g, n in enumerate(s['collections']))}, "
+              f"{s['gc_ms']:.1f} ms in total, longest {s['max_gc_ms']:.2f} ms")
+        if self.trace:
+            print("Blocks kept per frame: " + ", ".join(f"{k} {v:.1f} ({s['bytes'][k]:.0f} B)" for k, v in s["blocks"].items()))
+            print(f"Peak per frame: {s['animating_peak']:.0f} B animating, {s['idle_peak']:.0f} B idle")
+
+    def export(self, path):
+        with open(path, "w") as file:
+            json.dump({
+                "summary": self.summary(),
+                "over_budget": [f.number for f in self.over_budget()],
+                "frames": [f.to_dict() for f in self.frames],
+            }, file)
+    # endregion
+
+
+# Moves everything made at startup to the permanent generation, so later
+# collections don't go through the assets and the UI again
+def freeze_startup():
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+# Raises the youngest generation's threshold while cards are moving, so its
+# collections are put off until the board is still
+class AnimationGC():
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+        self.default = gc.get_threshold()
+        self.animating = False
+
+    def update(self, animating):
+        if animating == self.animating:
+            return
+        self.animating = animating
+        if animating:
+            gc.set_threshold(self.threshold, *self.default[1:])
+        else:
+            gc.set_threshold(*self.default)
+
+
+# What main.py and replay.py turn on from the command line
+class Instruments():
+    def __init__(self, monitor: FrameMonitor = None, path=None, freeze=False, threshold=None):
+        super().__init__()
+        self.monitor = monitor
+        self.path = path
+        self.freeze = freeze
+        self.tuning = AnimationGC(threshold) if threshold is not None else None
+
+    @classmethod
+    def from_args(cls, args):
+        if not (args.frame_report or args.gc_freeze or args.gc_threshold):
+            return None
+        monitor = FrameMonitor(args.frame_budget, not args.no_tracemalloc) if args.frame_report else None
+        return cls(monitor, args.frame_report, args.gc_freeze, args.gc_threshold)
+
+    # Called once startup is done
+    def start(self):
+        if self.freeze:
+            print(f"Froze {freeze_startup():,} objects")
+        if self.monitor is not None:
+            self.monitor.install()
+
+    def begin(self):
+        if self.monitor is not None:
+            self.monitor.begin()
+
+    def end(self, game):
+        animating = game is not None and bool(game.animations)
+        if self.tuning is not None:
+            self.tuning.update(animating)
+        if self.monitor is not None:
+            self.monitor.end(animating)
+
+    def close(self):
+        if self.tuning is not None:
+            self.tuning.update(False)
+        if self.monitor is None:
+            return
+        self.monitor.uninstall()
+        self.monitor.report()
+        if self.monitor.frames:
+            self.monitor.export(self.path)
+            print(f"Wrote {self.path}")
+
+
+def add_instrument_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--frame-report", metavar="FILE", help="count allocations and collections in every frame and write them to FILE")
+    parser.add_argument("--frame-budget", type=float, default=FRAME_BUDGET, help="milliseconds a frame may take before it's flagged")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="only count collections, which doesn't slow allocations down")
+    parser.add_argument("--gc-freeze", action="store_true", help="move the objects made at startup out of the collector's way")
+    parser.add_argument("--gc-threshold", type=int, metavar="N", help="collect the youngest generation every N allocations while cards move")
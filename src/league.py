@@ -0,0 +1,70 @@
+import argparse
+import math
+import os
+import statistics
+from multiprocessing import Pool
+
+from strategy import STRATEGIES, play
+
+# 95% confidence
+Z = 1.96
+
+
+def run(args):
+    name, seed, options = args
+    outcome = play(STRATEGIES[name](options), seed, options.max_decisions)
+    return name, outcome
+
+
+def wilson(wins, n):
+    p = wins/n
+    center = (p + Z*Z/(2*n))/(1 + Z*Z/n)
+    margin = Z*math.sqrt(p*(1-p)/n + Z*Z/(4*n*n))/(1 + Z*Z/n)
+    return center - margin, center + margin
+
+
+def mean_interval(values):
+    mean = statistics.fmean(values)
+    margin = Z*statistics.stdev(values)/math.sqrt(len(values)) if len(values) > 1 else 0
+    return mean, margin
+
+
+def report(name, outcomes):
+    n = len(outcomes)
+    wins = sum(o.won for o in outcomes)
+    low, high = wilson(wins, n)
+    moves, moves_margin = mean_interval([o.moves for o in outcomes])
+    rate, rate_margin = mean_interval([o.decisions/o.seconds for o in outcomes])
+    win_rate = f"{wins/n:.1%} [{low:.1%}, {high:.1%}]"
+    print(f"{name:>12} {win_rate:>23} {f'{moves:.1f} ± {moves_margin:.1f}':>17} {f'{rate:.0f} ± {rate_margin:.0f}':>19}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play every strategy on the same deals and compare them")
+    parser.add_argument("strategies", nargs="*", metavar="STRATEGY", help=f"strategies to compare: {', '.join(STRATEGIES)} (default: all)")
+    parser.add_argument("-n", "--count", type=int, default=200, help="number of deals")
+    parser.add_argument("-s", "--start", type=int, default=0, help="first seed")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-k", "--depth", type=int, default=2, help="plies searched by the lookahead strategy")
+    parser.add_argument("-m", "--max-nodes", type=int, default=20_000, help="solver budget per decision of the solver strategy")
+    parser.add_argument("--max-decisions", type=int, default=1000, help="decisions before a game counts as lost")
+    args = parser.parse_args()
+    args.strategies = args.strategies or list(STRATEGIES)
+    for name in args.strategies:
+        if name not in STRATEGIES:
+            parser.error(f"unknown strategy {name}")
+
+    tasks = [(name, seed, args) for seed in range(args.start, args.start + args.count) for name in args.strategies]
+    results = {name: [] for name in args.strategies}
+    with Pool(args.jobs) as pool:
+        for i, (name, outcome) in enumerate(pool.imap_unordered(run, tasks, 4)):
+            results[name].append(outcome)
+            print(f"{i+1}/{len(tasks)}", end="\r")
+
+    print(f"{'strategy':>12} {'win rate [95% CI]':>23} {'moves ± 95%':>17} {'decisions/s ± 95%':>19}")
+    for name, outcomes in results.items():
+        report(name, outcomes)
+
+
+if __name__ == "__main__":
+    main()
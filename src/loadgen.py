@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from random import Random
+
+from server import LINE_LIMIT, add_address_arguments
+
+# How often each request is made. A move is preceded by asking for the moves
+MIX = {
+    "move": 40,
+    "deal": 25,
+    "snapshot": 15,
+    "undo": 10,
+    "redo": 5,
+    "collect": 5,
+}
+
+
+class Client():
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__()
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.latencies = []
+        self.errors = 0
+
+    async def request(self, op, **args):
+        self.next_id += 1
+        start = time.perf_counter()
+        self.writer.write(json.dumps({"id": self.next_id, "op": op, **args}, separators=(",", ":")).encode() + b"\n")
+        response = json.loads(await self.reader.readline())
+        self.latencies.append(time.perf_counter() - start)
+        if response.get("id") != self.next_id:
+            raise RuntimeError(f"response {response.get('id')} to request {self.next_id}")
+        # Illegal requests are answered too, they just count separately
+        self.errors += "error" in response
+        return response
+
+
+async def connect(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix, limit=LINE_LIMIT)
+    return await asyncio.open_connection(args.host, args.port, limit=LINE_LIMIT)
+
+
+# Plays random requests on its own games until the deadline or the request
+# budget, one request at a time
+async def run_client(args, number, deadline):
+    rng = Random(args.seed + number)
+    client = Client(*await connect(args))
+    sessions = []
+    for _ in range(args.sessions):
+        sessions.append((await client.request("new", seed=rng.randrange(2**32)))["session"])
+
+    ops, weights = list(MIX), list(MIX.values())
+    while len(client.latencies) < args.requests and time.perf_counter() < deadline:
+        session = rng.choice(sessions)
+        op = rng.choices(ops, weights)[0]
+        if op == "move":
+            moves = (await client.request("moves", session=session))["moves"]
+            if moves:
+                source, target, amount = rng.choice(moves)
+                await client.request("move", session=session, **{"from": source, "to": target, "amount": amount})
+        else:
+            await client.request(op, session=session)
+
+    for session in sessions:
+        await client.request("close", session=session)
+    client.writer.close()
+    return client
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered)-1, int(len(ordered)*p))]*1000
+
+
+async def load(args):
+    deadline = time.perf_counter() + args.duration
+    start = time.perf_counter()
+    clients = await asyncio.gather(*(run_client(args, i, deadline) for i in range(args.clients)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(l for c in clients for l in c.latencies)
+    errors = sum(c.errors for c in clients)
+    print(f"{len(latencies):,} requests from {args.clients} clients on {args.clients*args.sessions:,} games in {seconds:.1f} s: {len(latencies)/seconds:,.0f} requests/s, {errors:,} refused")
+    print(f"Latency: mean {statistics.fmean(latencies)*1000:.2f} ms, p50 {percentile(latencies, .5):.2f} ms, p90 {percentile(latencies, .9):.2f} ms, "
+          f"p99 {percentile(latencies, .99):.2f} ms, p99.9 {percentile(latencies, .999):.2f} ms, max {latencies[-1]*1000:.2f} ms")
+
+
+# Starts server.py on the same address and waits until it accepts connections
+def spawn(args):
+    command = [sys.executable, os.path.join(os.path.dirname(__file__), "server.py"), "--max-sessions", str(args.clients*args.sessions)]
+    command += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the game server with random play and report throughput and latency")
+    add_address_arguments(parser)
+    parser.add_argument("-c", "--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("-g", "--sessions", type=int, default=20, help="games per connection")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="requests per connection")
+    parser.add_argument("-d", "--duration", type=float, default=30, help="seconds to stop after if the requests aren't done")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed for the deals and the requests")
+    parser.add_argument("--spawn", action="store_true", help="start a server for the run")
+    args = parser.parse_args()
+
+    server = spawn(args) if args.spawn else None
+    try:
+        asyncio.run(load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,179 @@
+import argparse
+import multiprocessing
+import random
+import time
+from functools import partial
+
+START = time.perf_counter()
+
 import pygame
 
 import assets
 import constants
+from cache import CACHE_DIR
+from checker import WinnableChecker
+from deals import DealIndex
 from game import Game
+from instrument import Instruments, add_instrument_arguments
+from observer import Change
+from recorder import Recorder
+from screen import RendererScreen, SurfaceScreen
 from ui import UI, UIType
+from variant import KLONDIKE, VARIANTS, Variant
+from view import View
+
+IMPORTED = time.perf_counter()
+
+MOUSE_EVENTS = ("down", "up", "move", "click", "drag", "dragbegin", "dragend")
+MOUSE_BUTTONS = {pygame.BUTTON_LEFT: ("l",), pygame.BUTTON_RIGHT: ("r",), pygame.BUTTON_MIDDLE: ("m",)}
 
 
 class App():
-    def __init__(self):
+    def __init__(self, renderer=None, seed=None, variant: Variant = KLONDIKE):
         super().__init__()
-        pygame.init()
+        self.variant = variant
+        # Every deal comes from this, so a session can be replayed from it
+        self.seed = random.randrange(2**32) if seed is None else seed
+        random.seed(self.seed)
+        self.recorder: Recorder = None
+        self.instruments: Instruments = None
+
+        # Only what the home screen needs, everything else is initialized on demand
+        pygame.display.init()
+        pygame.font.init()
+
+        assets.load_bundle()
+        size = variant.width, variant.height
+        if renderer is None:
+            self.screen = SurfaceScreen(size, "Solitaire", assets.get_icon())
+        else:
+            self.screen = RendererScreen(size, "Solitaire", assets.get_icon(), renderer or None)
 
         self.EVENTS = {
             pygame.QUIT: self.on_quit,
-            pygame.VIDEORESIZE: self.on_resize,
-            pygame.MOUSEBUTTONDOWN: self.mouse_event("down"),
-            pygame.MOUSEBUTTONUP: self.mouse_event("up"),
-            pygame.MOUSEMOTION: self.mouse_event("move"),
+            self.screen.RESIZE_EVENT: self.on_resize,
+            pygame.MOUSEBUTTONDOWN: partial(self.mouse_event, "down"),
+            pygame.MOUSEBUTTONUP: partial(self.mouse_event, "up"),
+            pygame.MOUSEMOTION: partial(self.mouse_event, "move"),
             pygame.KEYDOWN: self.on_key
         }
 
         self.mousedown = {b: False for b in ("l", "r", "m")}
         self.mousedrag = {b: False for b in ("l", "r", "m")}
+        self.mousedown_pos = {b: (0, 0) for b in ("l", "r", "m")}
 
-        pygame.display.set_caption("Solitaire")
-        pygame.display.set_icon(assets.get_icon())
-        self.screen = pygame.display.set_mode((constants.WIDTH, constants.HEIGHT), constants.SCREEN_FLAGS, vsync=True)
         self.clock = pygame.time.Clock()
-        assets.load_svgs()
+        assets.load_svgs_async()
+        self.deals = DealIndex(assets.normalize_path("deals"))
+        self.winnable = False
+        # Bucket of the deals index asked for on the home screen, any if None
+        self.level = None
+        self.checker: WinnableChecker = None
         self.game = None
+        self.view = View()
         self.ui = UI(self)
-        self.on_resize(pygame.event.Event(pygame.VIDEORESIZE, size=(constants.WIDTH, constants.HEIGHT)))
+        self.compile_mouse_handlers()
+        self.resize(size)
 
         self.running = True
 
-    def mouse_event(self, name):
-        def inner(event):
-            btns = []
-            button, buttons = getattr(event, "button", -1), getattr(event, "buttons", [])
-            if button == pygame.BUTTON_LEFT or pygame.BUTTON_LEFT in buttons:
-                btns.append("l")
-            if button == pygame.BUTTON_RIGHT or pygame.BUTTON_RIGHT in buttons:
-                btns.append("r")
-            if button == pygame.BUTTON_MIDDLE or pygame.BUTTON_MIDDLE in buttons:
-                btns.append("m")
-
-            pos = self.screen_to_game(event.pos)
-            getattr(self.ui, f"on_mouse{name}", lambda e: None)(event)
-            for b in btns:
-                getattr(self, f"on_mouse{name}", lambda e, b: None)(event, b)
-                getattr(self, f"on_mouse{name}_{b}", lambda e: None)(event)
-                getattr(self.ui, f"on_mouse{name}_{b}", lambda e: None)(event)
-                if self.game:
-                    getattr(self.game, f"on_mouse{name}_{b}", lambda p: None)(pos)
-        return inner
+    def compile_mouse_handlers(self):
+        # Looked up once so events don't go through getattr
+        self.mouse_handlers = {}
+        self.button_handlers = {}
+        self.game_handlers = {}
+        for name in MOUSE_EVENTS:
+            self.mouse_handlers[name] = [h for h in (getattr(self.ui, f"on_mouse{name}", None),) if h]
+            for b in ("l", "r", "m"):
+                handlers = [partial(h, b=b) for h in (getattr(self, f"on_mouse{name}", None),) if h]
+                handlers += [h for h in (getattr(self, f"on_mouse{name}_{b}", None), getattr(self.ui, f"on_mouse{name}_{b}", None)) if h]
+                self.button_handlers[name, b] = handlers
+                self.game_handlers[name, b] = getattr(Game, f"on_mouse{name}_{b}", None)
+
+    def mouse_event(self, name, event):
+        # Motion only ever drags with the left button
+        if event.type == pygame.MOUSEMOTION:
+            btns = ("l",) if any(event.buttons) else ()
+        else:
+            btns = MOUSE_BUTTONS.get(event.button, ())
+
+        pos = self.view.screen_to_game(event.pos)
+        for handler in self.mouse_handlers[name]:
+            handler(event)
+        for b in btns:
+            for handler in self.button_handlers[name, b]:
+                handler(event)
+            handler = self.game_handlers[name, b]
+            if handler and self.game:
+                handler(self.game, pos)
 
     def on_key(self, event):
         print(pygame.key.name(event.key))
         getattr(self, f"on_key_{pygame.key.name(event.key)}".lower(), lambda e: None)(event)
 
     def loop(self):
+        self.ui.draw(self.screen)
+        now = time.perf_counter()
+        print(f"Imports: {(IMPORTED - START)*1000:.0f} ms, first frame: {(now - START)*1000:.0f} ms")
+        if self.instruments is not None:
+            self.instruments.start()
+
         while self.running:
             self.clock.tick(200)
             print(f"FPS: {self.clock.get_fps():3.0f}", end="\r")
+            if self.instruments is not None:
+                self.instruments.begin()
             self.events()
             self.ui.draw(self.screen)
+            if self.instruments is not None:
+                self.instruments.end(self.game)
+
+        if self.recorder is not None:
+            self.recorder.close(self)
+        if self.instruments is not None:
+            self.instruments.close()
 
     def events(self):
-        for event in pygame.event.get():
-            try:
-                self.EVENTS[event.type](event)
-            except KeyError as e:
-                print(f"Event {pygame.event.event_name(event.type)} not handled", event.__dict__)
+        events = pygame.event.get()
+        if self.recorder is not None:
+            self.recorder.record(self.clock.get_time(), events)
+
+        self.dispatch(events)
+
+    def dispatch(self, events):
+        # Only the last of several motions in a row matters
+        previous = None
+        for event in events:
+            if previous is not None and not (previous.type == event.type == pygame.MOUSEMOTION):
+                self.handle(previous)
+            previous = event
+        if previous is not None:
+            self.handle(previous)
+
+    def handle(self, event):
+        try:
+            self.EVENTS[event.type](event)
+        except KeyError as e:
+            print(f"Event {pygame.event.event_name(event.type)} not handled", event.__dict__)
 
     def on_quit(self, event):
         self.running = False
 
     def on_resize(self, event):
-        width, height = event.size
-        if width/height < constants.RATIO:
-            self.scale = width/constants.WIDTH
+        self.resize(self.screen.event_size(event))
+
+    def resize(self, size):
+        width, height = size
+        if width/height < self.variant.ratio:
+            self.scale = width/self.variant.width
         else:
-            self.scale = height/constants.HEIGHT
+            self.scale = height/self.variant.height
 
-        self.origin = ((width/self.scale - constants.WIDTH)*.5, constants.APPBAR_HEIGHT)
+        self.origin = ((width/self.scale - self.variant.width)*.5, constants.APPBAR_HEIGHT)
+        self.view.place(self.origin, self.scale)
 
         assets.render_svgs(self.scale)
-        self.ui.render(event.size, self.scale)
+        self.ui.render(size, self.scale)
 
     def game_win(self):
         self.game.paused = True
@@ -95,23 +182,25 @@ class App():
     # region Mouse events
     def on_mousedown(self, event, b):
         self.mousedown[b] = True
+        self.mousedown_pos[b] = event.pos
 
     def on_mousemove(self, event, b):
         if not self.mousedrag[b] and self.mousedown[b]:
             self.mousedrag[b] = True
-            self.mouse_event("dragbegin")(event)
+            # Motions are coalesced, so start dragging from where the button went down
+            self.mouse_event("dragbegin", pygame.event.Event(event.type, event.dict, pos=self.mousedown_pos[b]))
 
         self.mousedrag[b] = self.mousedown[b]
 
         if self.mousedrag[b]:
-            self.mouse_event("drag")(event)
+            self.mouse_event("drag", event)
 
     def on_mouseup(self, event, b):
         self.mousedown[b] = False
         if self.mousedrag[b]:
-            self.mouse_event("dragend")(event)
+            self.mouse_event("dragend", event)
         else:
-            self.mouse_event("click")(event)
+            self.mouse_event("click", event)
 
     def on_mousedragend(self, event, b):
         self.mousedrag[b] = False
@@ -154,17 +243,34 @@ class App():
         self.game_win()
     # endregion
 
-    def screen_to_game(self, coords):
-        return (coords[0]/self.scale - self.origin[0], coords[1]/self.scale - self.origin[1])
-
-    def game_to_screen(self, coords):
-        return ((coords[0] + self.origin[0])*self.scale, (coords[1] + self.origin[1])*self.scale)
-
-    def new_game(self):
-        self.game = Game(self)
+    def new_game(self, winnable=None, level=None):
+        if winnable is not None:
+            self.winnable, self.level = winnable, level
+
+        # The deals index only has Klondike deals
+        seed = self.deals.random_seed(self.level) if self.winnable and self.variant.is_klondike else None
+        self.game = Game(self.view, seed, self.variant)
+        self.game.subscribe(Change.WIN, self.game_win)
+        self.ui.watch(self.game)
+        if self.variant.solvable:
+            if self.checker is None:
+                self.checker = WinnableChecker(CACHE_DIR)
+            self.checker.watch(self.game)
         self.ui.current = UIType.GAME
 
 
 if __name__ == "__main__":
-    app = App()
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Klondike solitaire")
+    parser.add_argument("--renderer", nargs="?", const="", metavar="DRIVER", help="draw with an SDL renderer instead of software blits, optionally picking its driver (e.g. software, opengl)")
+    parser.add_argument("--record", metavar="FILE", help="record the session's input for replay.py")
+    parser.add_argument("--seed", type=int, help="seed for the deals")
+    parser.add_argument("--variant", choices=VARIANTS, default=KLONDIKE.name, help="game to play")
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    app = App(args.renderer, args.seed, VARIANTS[args.variant])
+    if args.record:
+        app.recorder = Recorder(args.record, app)
+    app.instruments = Instruments.from_args(args)
     app.loop()
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 
 from animation import Animation, ConcurrentAnimations, FlipAnimation, SequentialAnimations
-from stack import Stack
+from stack import Stack, StockStack
 
 
 class Move(ABC):
@@ -30,6 +30,8 @@ class MoveMove(Move):
         if not self.reverse:
             cards = reversed(cards)
         self.from_stack.cards.extend(cards)
+        self.from_stack.touch()
+        self.to_stack.touch()
         return ConcurrentAnimations((self.from_stack.animate(), self.to_stack.animate()))
 
     def redo(self):
@@ -37,6 +39,8 @@ class MoveMove(Move):
         if not self.reverse:
             cards = reversed(cards)
         self.to_stack.cards.extend(cards)
+        self.from_stack.touch()
+        self.to_stack.touch()
         return ConcurrentAnimations((self.from_stack.animate(), self.to_stack.animate()))
 
 
@@ -54,6 +58,21 @@ class FlipMove(Move):
         return FlipAnimation(self.card)
 
 
+# Counts the times the waste was turned over, which some variants limit
+class RedealMove(Move):
+    def __init__(self, stock: StockStack):
+        super().__init__()
+        self.stock = stock
+
+    def undo(self):
+        self.stock.redeals -= 1
+        return ConcurrentAnimations(())
+
+    def redo(self):
+        self.stock.redeals += 1
+        return ConcurrentAnimations(())
+
+
 class ConcurrentMoves(Move):
     def __init__(self, moves):
         super().__init__()
@@ -0,0 +1,114 @@
+from observer import Change
+from solver import reach_table
+from stack import FoundationStack, Stack, TableauStack
+
+# (from_stack, to_stack, amount)
+LegalMove = tuple[Stack, Stack, int]
+
+
+class MoveGenerator():
+    def __init__(self, game):
+        super().__init__()
+        self.game = game
+        self.sources: tuple[Stack] = game.tableaus + (game.waste,) + game.foundations
+        self.targets: tuple[Stack] = game.foundations + game.tableaus
+        self.table: dict[Stack, dict[Stack, int]] = {s: {t: 0 for t in self.targets} for s in self.sources}
+        self.dirty: set[Stack] = set(self.sources)
+        self._moves: list[LegalMove] = None
+        for stack in self.sources:
+            stack.subscribe(Change.BOARD, self.dirty.add)
+
+    # region Queries
+    @property
+    def legal_moves(self) -> list[LegalMove]:
+        self.refresh()
+        if self._moves is None:
+            self._moves = [(s, t, a) for s, row in self.table.items() for t, a in row.items() if a]
+        return self._moves
+
+    @property
+    def can_deal(self):
+        game = self.game
+        if not game.stock.is_empty:
+            return True
+        redeals = game.variant.redeals
+        return not game.waste.is_empty and (redeals is None or game.stock.redeals < redeals)
+
+    # Whether dealing brings up a card that can be played. The cards the passes
+    # left can reach are looked up instead of dealing through them
+    @property
+    def deal_helps(self):
+        game = self.game
+        if not self.can_deal:
+            return False
+        talon = game.waste.cards + game.stock.cards[::-1]
+        top = game.waste.size-1
+        redeals = game.variant.redeals
+        reach = reach_table(game.variant.draw)[len(talon), game.waste.size, redeals is None or game.stock.redeals < redeals]
+        return any(t.can_enter(talon[i], 1) for i in reach if i != top for t in self.targets)
+
+    @property
+    def has_moves(self):
+        return bool(self.legal_moves) or self.deal_helps
+
+    def moves_from(self, stack: Stack) -> list[LegalMove]:
+        self.refresh()
+        return [(stack, t, a) for t, a in self.table.get(stack, {}).items() if a]
+
+    def hint(self) -> LegalMove:
+        best, best_score = None, 0
+        for move in self.legal_moves:
+            score = self.score(move)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+    # endregion
+
+    # region Incremental update
+    def refresh(self):
+        if not self.dirty:
+            return
+
+        for stack in self.dirty:
+            if stack in self.table:
+                row = self.table[stack]
+                for t in self.targets:
+                    row[t] = self.amount(stack, t)
+            if stack in self.targets:
+                for s in self.sources:
+                    self.table[s][stack] = self.amount(s, stack)
+        self.dirty.clear()
+        self._moves = None
+    # endregion
+
+    def amount(self, source: Stack, target: Stack):
+        if source is target or source.is_empty:
+            return 0
+
+        # Moving cards between foundations is never useful
+        if isinstance(source, FoundationStack) and isinstance(target, FoundationStack):
+            return 0
+
+        if not isinstance(source, TableauStack):
+            return 1 if target.can_enter(source.card_on_top, 1) else 0
+
+        for i in range(1, source.size+1):
+            card = source.cards[-i]
+            if card.flipped:
+                break
+            if target.can_enter(card, i):
+                return i
+        return 0
+
+    def score(self, move: LegalMove):
+        source, target, amount = move
+        if isinstance(target, FoundationStack):
+            return 4
+        if isinstance(source, TableauStack):
+            if source.size == amount:
+                # Moving a whole pile to an empty tableau gets nowhere
+                return 0 if target.is_empty else 2
+            return 3 if source.cards[-amount-1].flipped else 1
+        if isinstance(source, FoundationStack):
+            return 0
+        return 2
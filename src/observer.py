@@ -0,0 +1,26 @@
+from collections import defaultdict
+from enum import Enum, auto
+
+
+class Change(Enum):
+    BOARD = auto()
+    HISTORY = auto()
+    WIN = auto()
+
+
+class Observable():
+    __slots__ = ("observers",)
+
+    def __init__(self):
+        super().__init__()
+        self.observers: defaultdict[Change, list] = defaultdict(list)
+
+    def subscribe(self, change: Change, callback):
+        self.observers[change].append(callback)
+
+    def unsubscribe(self, change: Change, callback):
+        self.observers[change].remove(callback)
+
+    def publish(self, change: Change, *args):
+        for callback in self.observers[change]:
+            callback(*args)
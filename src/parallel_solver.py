@@ -0,0 +1,223 @@
+import argparse
+import os
+import time
+from multiprocessing import Event, Lock, Process, Queue, Value
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+
+from solver import Position, Result, search, solve
+
+TABLE_BITS = 22
+STRIPES = 64
+PROBES = 8
+# How often workers report their node count
+CHECK_EVERY = 256
+# How often workers look for idle ones to hand work to
+HANDOFF_EVERY = 32
+# Seconds to wait for the workers to exit before terminating them
+JOIN_TIMEOUT = 5
+HASH_MASK = (1 << 64) - 1
+
+
+# Open addressing table of 64 bit position hashes in shared memory, with
+# one lock for each stripe of slots
+class SharedTable():
+    def __init__(self, locks, bits=TABLE_BITS, name=None):
+        super().__init__()
+        self.locks = locks
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        # New shared memory is zero filled, and 0 marks an empty slot
+        self.memory = SharedMemory(name, name is None, 8 << bits)
+        self.slots = self.memory.buf.cast("Q")
+
+    @property
+    def args(self):
+        return self.locks, self.bits, self.memory.name
+
+    def insert(self, key):
+        h = hash(key) & HASH_MASK or 1
+        index = h & self.mask
+        with self.locks[index % len(self.locks)]:
+            for i in range(PROBES):
+                slot = (index + i) & self.mask
+                value = self.slots[slot]
+                if value == h:
+                    return True
+                if value == 0:
+                    break
+            # Replace the last probed slot if they were all taken
+            self.slots[slot] = h
+        return False
+
+    def close(self, unlink=False):
+        self.slots.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+# wanted counts the workers waiting for work less the subtrees already queued
+# for them, so each idle worker is handed one subtree
+def worker(table_args, work, results, pending, wanted, stop, nodes, max_nodes):
+    table = SharedTable(*table_args)
+    seen = set()
+    count = 0
+    # Subtrees still queued once the search stops aren't needed, so they
+    # mustn't hold up the exit
+    work.cancel_join_thread()
+
+    try:
+        while not stop.is_set():
+            with wanted.get_lock():
+                wanted.value += 1
+            item = None
+            while item is None and not stop.is_set():
+                try:
+                    item = work.get(timeout=.05)
+                except Empty:
+                    pass
+            if item is None:
+                break
+
+            stack = [item]
+            while stack and not stop.is_set():
+                pos, first = stack.pop()
+                pos = pos.auto()
+                if pos.won:
+                    results.put(Result(True, 0, first))
+                    stop.set()
+                    break
+
+                key = pos.key
+                if key in seen:
+                    continue
+                seen.add(key)
+                if table.insert(key):
+                    continue
+
+                count += 1
+                if count == CHECK_EVERY:
+                    with nodes.get_lock():
+                        nodes.value += count
+                        exhausted = nodes.value > max_nodes
+                    count = 0
+                    if exhausted:
+                        results.put(Result(None, 0))
+                        stop.set()
+                        break
+
+                stack.extend(reversed([(pos.apply(m), first) for m in pos.moves()]))
+
+                # Hand the shallowest pending subtree to whoever is waiting
+                if count % HANDOFF_EVERY == 0 and wanted.value > 0 and len(stack) > 1:
+                    with wanted.get_lock():
+                        handoff = wanted.value > 0
+                        if handoff:
+                            wanted.value -= 1
+                    if handoff:
+                        with pending.get_lock():
+                            pending.value += 1
+                        work.put(stack.pop(0))
+
+            with pending.get_lock():
+                pending.value -= 1
+                if pending.value == 0:
+                    stop.set()
+    finally:
+        with nodes.get_lock():
+            nodes.value += count
+        table.close()
+
+
+def drain(queue):
+    items = []
+    try:
+        while True:
+            items.append(queue.get_nowait())
+    except Empty:
+        pass
+    return items
+
+
+def solve_parallel(position: Position, jobs=None, max_nodes=2_000_000, bits=TABLE_BITS) -> Result:
+    jobs = jobs or os.cpu_count()
+    # Sharing the table only costs time with a single worker
+    if jobs == 1:
+        return solve(position, max_nodes)
+
+    root = position.auto()
+    if root.won:
+        return Result(True, 0)
+
+    children = [(root.apply(m), m) for m in root.moves()]
+    if not children:
+        return solve(position, max_nodes)
+
+    table = SharedTable([Lock() for _ in range(STRIPES)], bits)
+    work, results = Queue(), Queue()
+    pending, wanted, nodes = Value("q", len(children)), Value("q", -len(children)), Value("q", 1)
+    stop = Event()
+    for child in children:
+        work.put(child)
+
+    processes = [Process(target=worker, args=(table.args, work, results, pending, wanted, stop, nodes, max_nodes), daemon=True) for _ in range(jobs)]
+    try:
+        for process in processes:
+            process.start()
+        stop.wait()
+
+        # A process that put on a queue only exits once what it put was read,
+        # so both are drained while waiting for them
+        found = []
+        deadline = time.monotonic() + JOIN_TIMEOUT
+        while any(p.is_alive() for p in processes) and time.monotonic() < deadline:
+            found += drain(results)
+            drain(work)
+            for process in processes:
+                process.join(.01)
+        try:
+            while True:
+                found.append(results.get(timeout=.1))
+        except Empty:
+            pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        table.close(True)
+
+    # A win beats running out of budget, which beats an exhausted search
+    result = next((r for r in found if r.winnable), found[0] if found else Result(False, 0))
+    result.nodes = nodes.value
+    # The workers don't split runs, so like solve, only a search with every
+    # move can tell a lost deal. It's rare enough to run in this process
+    if result.winnable is False:
+        rest = search(position, max_nodes - result.nodes, splits=True)
+        rest.nodes += result.nodes
+        return rest
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a single deal with several processes")
+    parser.add_argument("seed", type=int, help="seed of the deal")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-m", "--max-nodes", type=int, default=2_000_000, help="search budget")
+    parser.add_argument("-c", "--compare", action="store_true", help="also time the single process search")
+    args = parser.parse_args()
+
+    position = Position.from_seed(args.seed)
+    searches = [("parallel", lambda: solve_parallel(position, args.jobs, args.max_nodes))]
+    if args.compare:
+        searches.append(("sequential", lambda: solve(position, args.max_nodes)))
+
+    for name, search in searches:
+        start = time.perf_counter()
+        result = search()
+        elapsed = time.perf_counter() - start
+        print(f"{name}: winnable={result.winnable} nodes={result.nodes} time={elapsed:.2f} s ({result.nodes/elapsed:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
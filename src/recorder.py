@@ -0,0 +1,33 @@
+import json
+
+import pygame
+
+# Only the events App handles are worth replaying
+RECORDED_EVENTS = {pygame.QUIT, pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN}
+
+
+def encode_event(event):
+    return [event.type, {k: v for k, v in event.dict.items() if isinstance(v, (int, float, str, tuple, list))}]
+
+
+def decode_event(data):
+    type, attrs = data
+    return pygame.event.Event(type, {k: tuple(v) if isinstance(v, list) else v for k, v in attrs.items()})
+
+
+# Writes one JSON line per frame: the time it took and the events handled in it
+class Recorder():
+    def __init__(self, path, app):
+        super().__init__()
+        self.file = open(path, "w")
+        self.write({"seed": app.seed, "size": app.screen.get_size(), "variant": app.variant.to_dict()})
+
+    def write(self, data):
+        self.file.write(json.dumps(data, separators=(",", ":")) + "\n")
+
+    def record(self, time, events):
+        self.write({"time": time, "events": [encode_event(e) for e in events if e.type in RECORDED_EVENTS]})
+
+    def close(self, app):
+        self.write({"board": app.game.snapshot() if app.game else None})
+        self.file.close()
@@ -0,0 +1,92 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from instrument import FRAME_BUDGET, Instruments, add_instrument_arguments
+from main import App
+from recorder import decode_event
+from variant import KLONDIKE, Variant
+
+
+# Stands in for pygame.time.Clock, giving back the recorded frame times
+class FixedClock():
+    def __init__(self):
+        super().__init__()
+        self.time = 0
+
+    def tick(self, framerate=0):
+        return self.time
+
+    def get_time(self):
+        return self.time
+
+    def get_fps(self):
+        return 1000/self.time if self.time else 0
+
+
+def replay(path, renderer=None, instruments: Instruments = None):
+    with open(path) as file:
+        lines = [json.loads(line) for line in file]
+    header, frames = lines[0], [line for line in lines[1:] if "events" in line]
+    footer = lines[-1] if "board" in lines[-1] else None
+
+    variant = Variant(**header["variant"]) if "variant" in header else KLONDIKE
+    app = App(renderer, header["seed"], variant)
+    app.clock = FixedClock()
+    app.ui.draw(app.screen)
+    if instruments is not None:
+        instruments.start()
+
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        if instruments is not None:
+            instruments.begin()
+        app.clock.time = frame["time"]
+        app.dispatch([decode_event(event) for event in frame["events"]])
+        app.ui.draw(app.screen)
+        if instruments is not None:
+            instruments.end(app.game)
+        times.append((time.perf_counter() - start)*1000)
+    if instruments is not None:
+        instruments.close()
+
+    board = app.game.snapshot() if app.game else None
+    matches = footer is None or footer["board"] == board
+    return times, matches
+
+
+def report(times):
+    times = sorted(times)
+
+    def percentile(p):
+        return times[min(len(times)-1, int(len(times)*p))]
+
+    print(f"Frames: {len(times)}")
+    print(f"Mean: {statistics.fmean(times):.3f} ms, median: {percentile(.5):.3f} ms")
+    print(f"P95: {percentile(.95):.3f} ms, P99: {percentile(.99):.3f} ms, max: {times[-1]:.3f} ms")
+    print(f"Over {FRAME_BUDGET} ms: {sum(t > FRAME_BUDGET for t in times)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session headlessly and time every frame")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--renderer", nargs="?", const="", metavar="DRIVER", help="replay with an SDL renderer")
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    times, matches = replay(args.recording, args.renderer, Instruments.from_args(args))
+    if times:
+        report(times)
+    print("Final board matches the recording" if matches else "Final board DIFFERS from the recording")
+    sys.exit(0 if matches else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from weakref import WeakKeyDictionary
+
+import pygame
+from pygame._sdl2.video import Renderer, Texture, Window, get_drivers
+
+import constants
+
+
+# Software blits onto the display surface
+class SurfaceScreen():
+    RESIZE_EVENT = pygame.VIDEORESIZE
+
+    def __init__(self, size, caption, icon):
+        super().__init__()
+        pygame.display.set_caption(caption)
+        pygame.display.set_icon(icon)
+        self.surface = pygame.display.set_mode(size, constants.SCREEN_FLAGS, vsync=True)
+
+    def get_size(self):
+        return self.surface.get_size()
+
+    def fill(self, color):
+        self.surface.fill(color)
+
+    def blit(self, surface, dest):
+        self.surface.blit(surface, dest)
+
+    def blits(self, sequence):
+        self.surface.blits(sequence, doreturn=False)
+
+    def blit_scaled(self, surface, dest, size):
+        self.surface.blit(pygame.transform.smoothscale(surface, size), dest)
+
+    def flip(self):
+        pygame.display.flip()
+
+    @staticmethod
+    def event_size(event):
+        return event.size
+
+
+# Surfaces are uploaded once as textures and scaled by the renderer when drawn
+class RendererScreen():
+    RESIZE_EVENT = pygame.WINDOWSIZECHANGED
+
+    def __init__(self, size, caption, icon, driver=None):
+        super().__init__()
+        index = -1
+        if driver is not None:
+            drivers = [d.name for d in get_drivers()]
+            index = next((i for i, name in enumerate(drivers) if name == driver), None)
+            if index is None:
+                raise ValueError(f"Unknown render driver {driver!r}, available: {', '.join(drivers)}")
+        self.window = Window(caption, size, resizable=True)
+        self.window.set_icon(icon)
+        self.renderer = Renderer(self.window, index, accelerated=0 if driver == "software" else -1, vsync=True)
+        self.textures: WeakKeyDictionary[pygame.Surface, Texture] = WeakKeyDictionary()
+
+    def texture(self, surface):
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.textures[surface] = Texture.from_surface(self.renderer, surface)
+        return texture
+
+    def get_size(self):
+        return self.window.size
+
+    def fill(self, color):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.clear()
+
+    def blit(self, surface, dest):
+        self.texture(surface).draw(dstrect=(*dest, *surface.get_size()))
+
+    def blits(self, sequence):
+        for surface, dest in sequence:
+            self.texture(surface).draw(dstrect=(*dest, *surface.get_size()))
+
+    def blit_scaled(self, surface, dest, size):
+        self.texture(surface).draw(dstrect=(*dest, *size))
+
+    def flip(self):
+        self.renderer.present()
+
+    @staticmethod
+    def event_size(event):
+        return event.x, event.y
@@ -0,0 +1,232 @@
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from game import Game
+from stack import Stack
+from strategy import settle
+from variant import KLONDIKE, VARIANTS
+
+# Longest request line, longer ones close the connection
+LINE_LIMIT = 64*1024
+# Responses buffered for a client before it stops being read from
+WRITE_BUFFER = 256*1024
+# Requests served from one connection's buffer before letting the others in
+BATCH = 64
+
+
+# A headless game. Moves are applied straight away, there are no animations
+class Session():
+    def __init__(self, game: Game):
+        super().__init__()
+        self.game = game
+        self.stacks = game.named_stacks()
+        self.names: dict[Stack, str] = {s: name for name, s in self.stacks.items()}
+        self.used = time.monotonic()
+
+    def status(self):
+        return {"won": self.game.won, "moves": len(self.game.history.past)}
+
+
+# One JSON object per line each way. Requests carry an "op" and, for
+# everything but "new", a "session". Responses echo the request's "id" and
+# either hold the result or an "error"
+class Server():
+    def __init__(self, max_sessions=10_000, idle=300):
+        super().__init__()
+        self.sessions: dict[int, Session] = {}
+        self.ids = itertools.count(1)
+        self.max_sessions = max_sessions
+        # Seconds a session is kept without requests
+        self.idle = idle
+        self.requests = 0
+        self.evicted = 0
+        self.handlers = {
+            "new": self.on_new,
+            "moves": self.on_moves,
+            "move": self.on_move,
+            "deal": self.on_deal,
+            "collect": self.on_collect,
+            "undo": self.on_undo,
+            "redo": self.on_redo,
+            "snapshot": self.on_snapshot,
+            "close": self.on_close,
+        }
+
+    def stack(self, session: Session, request, field) -> Stack:
+        name = request.get(field)
+        if type(name) is not str or name not in session.stacks:
+            raise ValueError(f"{field} must be one of {', '.join(session.stacks)}")
+        return session.stacks[name]
+
+    def session(self, request) -> Session:
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ValueError(f"no session {request.get('session')}")
+        session.used = time.monotonic()
+        return session
+
+    def respond(self, line: bytes) -> bytes:
+        self.requests += 1
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("requests are JSON objects")
+            if "id" in request:
+                response["id"] = request["id"]
+            handler = self.handlers.get(request.get("op"))
+            if handler is None:
+                raise ValueError(f"unknown op {request.get('op')}")
+            response.update(handler(request))
+        except KeyError as e:
+            response["error"] = f"unknown name {e.args[0]}"
+        except (TypeError, ValueError) as e:
+            response["error"] = str(e)
+        return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+    # region Ops
+    def on_new(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            self.evict()
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError("too many sessions")
+
+        game = Game(None, request.get("seed"), VARIANTS[request.get("variant", KLONDIKE.name)])
+        settle(game)
+        id = next(self.ids)
+        self.sessions[id] = Session(game)
+        return {"session": id, "seed": game.seed, "state": game.snapshot()}
+
+    def on_moves(self, request):
+        session = self.session(request)
+        moves = session.game.moves
+        return {"moves": [(session.names[s], session.names[t], a) for s, t, a in moves.legal_moves], "can_deal": moves.can_deal}
+
+    def on_move(self, request):
+        session = self.session(request)
+        game = session.game
+        amount = request.get("amount", 1)
+        # 1.0 would compare equal to a legal amount of 1
+        if type(amount) is not int or amount < 1:
+            raise ValueError("amount must be a positive integer")
+        move = self.stack(session, request, "from"), self.stack(session, request, "to"), amount
+        if move not in game.moves.legal_moves:
+            raise ValueError("illegal move")
+        game.move_cards(*move)
+        settle(game)
+        return session.status()
+
+    def on_deal(self, request):
+        session = self.session(request)
+        if not session.game.moves.can_deal:
+            raise ValueError("nothing to deal")
+        session.game.deal_card()
+        settle(session.game)
+        return session.status()
+
+    def on_collect(self, request):
+        session = self.session(request)
+        session.game.collect_all()
+        settle(session.game)
+        return session.status()
+
+    def on_undo(self, request):
+        session = self.session(request)
+        session.game.undo()
+        settle(session.game)
+        return session.status()
+
+    def on_redo(self, request):
+        session = self.session(request)
+        session.game.redo()
+        settle(session.game)
+        return session.status()
+
+    def on_snapshot(self, request):
+        session = self.session(request)
+        return {"state": session.game.snapshot(), **session.status()}
+
+    def on_close(self, request):
+        self.session(request)
+        del self.sessions[request["session"]]
+        return {}
+    # endregion
+
+    def evict(self):
+        oldest = time.monotonic() - self.idle
+        for id in [id for id, s in self.sessions.items() if s.used < oldest]:
+            del self.sessions[id]
+            self.evicted += 1
+
+    async def evict_idle(self, verbose):
+        requests = 0
+        while True:
+            await asyncio.sleep(self.idle/4)
+            self.evict()
+            if verbose:
+                print(f"{len(self.sessions)} sessions, {self.evicted} evicted, {(self.requests - requests)/(self.idle/4):,.0f} requests/s")
+            requests = self.requests
+
+    # Requests from one connection are answered in order. A client that
+    # doesn't read its responses fills the write buffer, and then isn't read
+    # from until it catches up
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.transport.set_write_buffer_limits(WRITE_BUFFER)
+        served = 0
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b'{"error":"request too long"}\n')
+                    break
+                if not line:
+                    break
+                writer.write(self.respond(line))
+                await writer.drain()
+                served += 1
+                if served % BATCH == 0:
+                    await asyncio.sleep(0)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    server = Server(args.max_sessions, args.idle)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.serve_client, args.unix, limit=LINE_LIMIT)
+    else:
+        listener = await asyncio.start_server(server.serve_client, args.host, args.port, limit=LINE_LIMIT)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'}", flush=True)
+    eviction = asyncio.create_task(server.evict_idle(args.verbose))
+    async with listener:
+        await listener.serve_forever()
+    eviction.cancel()
+
+
+def add_address_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host headless games for bots and remote UIs over newline-delimited JSON")
+    add_address_arguments(parser)
+    parser.add_argument("--max-sessions", type=int, default=10_000, help="games kept at once")
+    parser.add_argument("--idle", type=float, default=300, help="seconds before an unused game is dropped")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the session count and request rate")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
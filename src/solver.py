@@ -0,0 +1,322 @@
+import time
+from random import Random
+
+from card import Suit, Symbol
+
+# Cards are encoded as symbol*4 + suit, the same order Game.create_deck uses,
+# so suits 2 and 3 (hearts and diamonds) are the red ones
+SUITS = list(Suit)
+SYMBOLS = list(Symbol)
+DECK_SIZE = len(SUITS)*len(SYMBOLS)
+
+TABLEAUS = 7
+# Cards left for the talon after a single deck deal
+STOCK_SIZE = DECK_SIZE - TABLEAUS*(TABLEAUS+1)//2
+
+TABLEAU = 0
+TALON = 1
+FOUNDATION = 2
+
+# How often the time limit and cancellation are checked
+CHECK_EVERY = 256
+
+
+def card_id(card):
+    return card.face.index
+
+
+def rank(c):
+    return c >> 2
+
+
+def suit(c):
+    return c & 3
+
+
+def can_stack(c, onto):
+    return rank(c)+1 == rank(onto) and (c ^ onto) & 2
+
+
+# Talon cards that dealing can bring to the top of the waste, by talon length,
+# waste size and whether a redeal is left. Each maps the index of the card to
+# whether getting to it takes a redeal. Within one pass the waste top moves
+# forward by the draw count, and a redeal starts over from the first card.
+# Passes after the first redeal reach the same cards again, so one redeal is
+# as good as any number of them
+class ReachTable(dict):
+    def __init__(self, draw):
+        super().__init__()
+        self.draw = draw
+        # Every talon a single deck deal can leave
+        for length in range(STOCK_SIZE+1):
+            for waste in range(length+1):
+                self[length, waste, False]
+                self[length, waste, True]
+
+    def __missing__(self, key):
+        length, waste, redeal = key
+        draw = self.draw
+        reach = {min(i, length-1): False for i in range(waste-1, length-1 + draw, draw) if i >= 0}
+        if redeal:
+            reach = {**{min(i, length-1): True for i in range(draw-1, length-1 + draw, draw)}, **reach}
+        self[key] = reach
+        return reach
+
+
+REACH = {draw: ReachTable(draw) for draw in (1, 3)}
+
+
+def reach_table(draw) -> ReachTable:
+    table = REACH.get(draw)
+    if table is None:
+        table = REACH[draw] = ReachTable(draw)
+    return table
+
+
+def deal_order(seed):
+    deck = list(range(DECK_SIZE))
+    Random(seed).shuffle(deck)
+    return deck
+
+
+class Position():
+    def __init__(self, tableaus, talon, foundations, waste=0, draw=1, redeals=None):
+        super().__init__()
+        # Each tableau is a (face down, face up) pair of tuples, top last
+        self.tableaus: tuple[tuple[tuple[int], tuple[int]]] = tableaus
+        # Waste from bottom to top followed by the stock in dealing order
+        self.talon: tuple[int] = talon
+        # Number of cards on the foundation of each suit
+        self.foundations: tuple[int] = foundations
+        # Cards of the talon in the waste, the cards dealt at a time and the
+        # redeals left, None for unlimited. Dealing one card at a time with
+        # unlimited redeals makes every card reachable, so then the split
+        # point doesn't matter
+        self.waste = waste
+        self.draw = draw
+        self.redeals = redeals
+
+    @classmethod
+    def from_seed(cls, seed, draw=1, redeals=None):
+        stock = deal_order(seed)
+        tableaus = []
+        for i in range(TABLEAUS):
+            cards = [stock.pop() for _ in range(i+1)]
+            tableaus.append((tuple(cards[:-1]), (cards[-1],)))
+        return cls(tuple(tableaus), tuple(reversed(stock)), (0,)*len(SUITS), 0, draw, redeals)
+
+    @classmethod
+    def from_game(cls, game):
+        variant = game.variant
+        tableaus = tuple((tuple(card_id(c) for c in t.cards if c.flipped), tuple(card_id(c) for c in t.cards if not c.flipped)) for t in game.tableaus)
+        talon = tuple(card_id(c) for c in game.waste.cards) + tuple(card_id(c) for c in reversed(game.stock.cards))
+        foundations = [0]*len(SUITS)
+        for f in game.foundations:
+            if not f.is_empty:
+                foundations[card_id(f.card_on_top) & 3] = f.size
+        redeals = None if variant.redeals is None else variant.redeals - game.stock.redeals
+        return cls(tableaus, talon, tuple(foundations), game.waste.size, variant.draw, redeals)
+
+    @property
+    def won(self):
+        return sum(self.foundations) == DECK_SIZE
+
+    @property
+    def free_talon(self):
+        return self.draw == 1 and self.redeals is None
+
+    @property
+    def key(self):
+        if self.free_talon:
+            return self.talon, tuple(sorted(self.tableaus))
+        return self.talon, tuple(sorted(self.tableaus)), self.draw, self.waste, self.redeals
+
+    # Index of each talon card that can be played, with whether it takes a redeal
+    @property
+    def reachable(self) -> dict[int, bool]:
+        return reach_table(self.draw)[len(self.talon), self.waste, self.redeals != 0]
+
+    # Talon cards the safe moves may play: any of them when dealing one at a
+    # time with unlimited redeals, otherwise only the top of the waste, as
+    # dealing further changes what the later passes can reach
+    def auto_talon(self):
+        if self.free_talon:
+            return range(len(self.talon))
+        return range(self.waste-1, self.waste) if self.waste else ()
+
+    # region Move helpers
+    def to_foundation(self, c):
+        return self.foundations[suit(c)] == rank(c)
+
+    def is_safe(self, c):
+        r = rank(c)
+        if r <= 1:
+            return True
+        opposite = (0, 1) if c & 2 else (2, 3)
+        return min(self.foundations[s] for s in opposite) >= r
+
+    def _take(self, tableaus, i, amount):
+        down, up = tableaus[i]
+        up = up[:-amount]
+        if not up and down:
+            down, up = down[:-1], down[-1:]
+        tableaus[i] = down, up
+    # endregion
+
+    def apply(self, move) -> "Position":
+        src, index, amount, dst, target = move
+        tableaus = list(self.tableaus)
+        talon = self.talon
+        foundations = self.foundations
+        waste, redeals = self.waste, self.redeals
+
+        if src == TABLEAU:
+            cards = tableaus[index][1][-amount:]
+            self._take(tableaus, index, amount)
+        elif src == TALON:
+            cards = (talon[index],)
+            # Dealt up to the card, so the ones under it stay in the waste
+            if redeals and self.reachable[index]:
+                redeals -= 1
+            waste = index
+            talon = talon[:index] + talon[index+1:]
+        else:
+            cards = (foundations[index]-1 << 2 | index,)
+            foundations = list(foundations)
+            foundations[index] -= 1
+            foundations = tuple(foundations)
+
+        if dst == TABLEAU:
+            down, up = tableaus[target]
+            tableaus[target] = down, up + cards
+        else:
+            foundations = list(foundations)
+            foundations[target] += 1
+            foundations = tuple(foundations)
+
+        return Position(tuple(tableaus), talon, foundations, waste, self.draw, redeals)
+
+    def auto(self) -> "Position":
+        pos = self
+        moved = True
+        while moved:
+            moved = False
+            for i, (_, up) in enumerate(pos.tableaus):
+                if up and pos.to_foundation(up[-1]) and pos.is_safe(up[-1]):
+                    pos = pos.apply((TABLEAU, i, 1, FOUNDATION, suit(up[-1])))
+                    moved = True
+            for i in pos.auto_talon():
+                c = pos.talon[i]
+                if pos.to_foundation(c) and pos.is_safe(c):
+                    pos = pos.apply((TALON, i, 1, FOUNDATION, suit(c)))
+                    moved = True
+                    break
+        return pos
+
+    # Splitting a run other than to free a card for the foundations rarely
+    # helps, so it's only tried when splits is set
+    def moves(self, splits=False):
+        tableaus = self.tableaus
+        empty = next((i for i, (down, up) in enumerate(tableaus) if not down and not up), None)
+        revealing, talon, partial, emptying, back, split = [], [], [], [], [], []
+
+        for i, (down, up) in enumerate(tableaus):
+            if not up:
+                continue
+            if self.to_foundation(up[-1]):
+                yield TABLEAU, i, 1, FOUNDATION, suit(up[-1])
+
+            for j, c in enumerate(up):
+                amount = len(up) - j
+                for k, (d, u) in enumerate(tableaus):
+                    if k == i:
+                        continue
+                    if u:
+                        if not can_stack(c, u[-1]):
+                            continue
+                    elif d or k != empty or rank(c) != 12 or (j == 0 and not down):
+                        continue
+
+                    move = TABLEAU, i, amount, TABLEAU, k
+                    if j == 0:
+                        (revealing if down else emptying).append((len(down), move))
+                    elif self.to_foundation(up[j-1]):
+                        partial.append(move)
+                    elif splits:
+                        split.append(move)
+
+        for i in self.reachable:
+            c = self.talon[i]
+            if self.to_foundation(c):
+                yield TALON, i, 1, FOUNDATION, suit(c)
+            for k, (d, u) in enumerate(tableaus):
+                if (u and can_stack(c, u[-1])) or (not u and not d and k == empty and rank(c) == 12):
+                    talon.append((TALON, i, 1, TABLEAU, k))
+
+        for s, count in enumerate(self.foundations):
+            if count < 2:
+                continue
+            c = count-1 << 2 | s
+            for k, (d, u) in enumerate(tableaus):
+                if u and can_stack(c, u[-1]):
+                    back.append((FOUNDATION, s, 1, TABLEAU, k))
+
+        yield from (move for _, move in sorted(revealing, key=lambda x: -x[0]))
+        yield from talon
+        yield from partial
+        yield from (move for _, move in emptying)
+        yield from back
+        yield from split
+
+
+class Result():
+    def __init__(self, winnable, nodes, move=None):
+        super().__init__()
+        # True, False, or None if the search ran out of budget
+        self.winnable = winnable
+        self.nodes = nodes
+        # First move of the winning line found, if any
+        self.move = move
+
+
+# Searches without splitting runs first, which finds most wins sooner. Only
+# the search with every move can prove a deal lost, so it's run with what's
+# left of the budget when the first one runs out of moves
+def solve(position: Position, max_nodes=200_000, time_limit=None, cancelled=None) -> Result:
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    result = search(position, max_nodes, deadline, cancelled)
+    if result.winnable is False:
+        nodes = result.nodes
+        result = search(position, max_nodes - nodes, deadline, cancelled, True)
+        result.nodes += nodes
+    return result
+
+
+def search(position: Position, max_nodes, deadline=None, cancelled=None, splits=False) -> Result:
+    seen = set()
+    stack = [(position, None)]
+    nodes = 0
+    while stack:
+        pos, first = stack.pop()
+        pos = pos.auto()
+        if pos.won:
+            return Result(True, nodes, first)
+
+        key = pos.key
+        if key in seen:
+            continue
+        seen.add(key)
+
+        nodes += 1
+        if nodes > max_nodes:
+            return Result(None, nodes)
+        if nodes % CHECK_EVERY == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return Result(None, nodes)
+            if cancelled is not None and cancelled():
+                return Result(None, nodes)
+
+        children = [(pos.apply(m), first or m) for m in pos.moves(splits)]
+        stack.extend(reversed(children))
+
+    return Result(False, nodes)
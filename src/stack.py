@@ -1,21 +1,33 @@
 from abc import ABC, abstractmethod
-from collections import deque
+from itertools import islice
 
 import pygame
 
 import assets
 import constants
 from animation import ConcurrentAnimations, MoveAnimation
-from card import Card, Symbol
+from card import RANKS, Card, Symbol
+from observer import Change, Observable
 
+ACE = RANKS[Symbol.ACE]
+KING = RANKS[Symbol.KING]
 
-class Stack(ABC):
-    def __init__(self, app, pos):
+
+class Stack(Observable, ABC):
+    __slots__ = ("view", "pos", "cards", "draw_empty", "lifted", "dest", "dest_layout")
+    # Whether the cards pile up on the stack's position
+    squared = False
+
+    def __init__(self, view, pos):
         super().__init__()
-        self.app = app
+        self.view = view
         self.pos = pos
-        self.cards: deque[Card] = deque()
+        self.cards: list[Card] = []
         self.draw_empty = True
+        # Cards on top that are being dragged and drawn by the DragStack
+        self.lifted = 0
+        self.dest = None
+        self.dest_layout = None
 
     @property
     def card_on_top(self):
@@ -41,6 +53,9 @@ class Stack(ABC):
     def rect(self):
         return pygame.Rect(self.pos, (constants.CARD_WIDTH, constants.CARD_HEIGHT))
 
+    def touch(self):
+        self.publish(Change.BOARD, self)
+
     def reset_pos(self):
         for card, pos in zip(self.cards, self.get_card_pos()):
             card.pos = pos
@@ -55,10 +70,36 @@ class Stack(ABC):
 
     def draw(self, screen):
         if self.draw_empty:
-            screen.blit(assets.empty_surface, self.app.game_to_screen(self.pos))
-        for card in self.cards:
+            screen.blit(assets.get_empty_surface(), self.view.game_to_screen(self.pos))
+        for card in self.visible_cards():
             card.draw(screen)
 
+    # A card resting on the position of a squared stack hides every card under
+    # it, which keeps multi-deck stocks and foundations cheap to draw
+    def visible_cards(self):
+        end = self.size - self.lifted
+        if self.squared:
+            for i in range(end-1, -1, -1):
+                card = self.cards[i]
+                if card.pos == self.pos and card.width_scale == 1:
+                    return islice(self.cards, i, end)
+        return islice(self.cards, end)
+
+    # Adds what draw would blit to a batch for Surface.blits. Flipping cards
+    # are scaled, so the batch is flushed to keep them in order
+    def collect(self, blits, screen):
+        if self.draw_empty:
+            if self.dest_layout != self.view.layout:
+                self.dest, self.dest_layout = self.view.game_to_screen(self.pos), self.view.layout
+            blits.append((assets.get_empty_surface(), self.dest))
+        for card in self.visible_cards():
+            if card.width_scale == 1:
+                blits.append(card.blit_item())
+            else:
+                screen.blits(blits)
+                blits.clear()
+                card.draw(screen)
+
     @abstractmethod
     def get_card_pos(self):
         pass
@@ -68,15 +109,17 @@ class Stack(ABC):
         return True
 
     def get_cards_to_drag(self, pos):
-        if self.rect.collidepoint(pos):
+        if not self.is_empty and self.rect.collidepoint(pos):
             return 1
         return 0
 
 
 # Fanned down
 class TableauStack(Stack):
-    def __init__(self, app, pos):
-        super().__init__(app, pos)
+    __slots__ = ()
+
+    def __init__(self, view, pos):
+        super().__init__(view, pos)
 
     @property
     def rect(self):
@@ -94,9 +137,10 @@ class TableauStack(Stack):
 
     def can_enter(self, card: Card, amount):
         if self.is_empty:
-            return card.symbol == Symbol.KING
+            return card.face.rank == KING
 
-        return self.card_on_top.suit.is_black == card.suit.is_red and card.symbol.is_previous(self.card_on_top.symbol)
+        top, face = self.cards[-1].face, card.face
+        return top.is_red != face.is_red and face.rank+1 == top.rank
 
     def get_cards_to_drag(self, pos):
         if not self.rect.collidepoint(pos) or self.is_empty:
@@ -113,8 +157,11 @@ class TableauStack(Stack):
 
 # Squared
 class FoundationStack(Stack):
-    def __init__(self, app, pos):
-        super().__init__(app, pos)
+    __slots__ = ()
+    squared = True
+
+    def __init__(self, view, pos):
+        super().__init__(view, pos)
 
     def get_card_pos(self):
         return [self.pos]*self.size
@@ -124,15 +171,20 @@ class FoundationStack(Stack):
             return False
 
         if self.is_empty:
-            return card.symbol == Symbol.ACE
+            return card.face.rank == ACE
 
-        return self.card_on_top.suit == card.suit and card.symbol.is_next(self.card_on_top.symbol)
+        top, face = self.cards[-1].face, card.face
+        return top.suit is face.suit and face.rank == top.rank+1
 
 
 # Deck
 class StockStack(FoundationStack):
-    def __init__(self, app, pos):
-        super().__init__(app, pos)
+    __slots__ = ("redeals",)
+
+    def __init__(self, view, pos):
+        super().__init__(view, pos)
+        # Times the waste was turned over into it
+        self.redeals = 0
 
     def get_card_pos(self):
         return [self.pos]*self.size
@@ -146,8 +198,11 @@ class StockStack(FoundationStack):
 
 # Fanned sideways
 class WasteStack(Stack):
-    def __init__(self, app, pos):
-        super().__init__(app, pos)
+    __slots__ = ()
+    squared = True
+
+    def __init__(self, view, pos):
+        super().__init__(view, pos)
         self.draw_empty = False
 
     @property
@@ -170,6 +225,8 @@ class WasteStack(Stack):
         return False
 
     def get_cards_to_drag(self, pos):
+        if self.is_empty:
+            return 0
         if pygame.Rect(list(self.get_card_pos()).pop(), (constants.CARD_WIDTH, constants.CARD_HEIGHT)).collidepoint(pos):
             return 1
         return 0
@@ -177,17 +234,60 @@ class WasteStack(Stack):
 
 # Follows the mouse
 class DragStack(TableauStack):
-    def __init__(self, app, pos):
-        super().__init__(app, pos)
+    __slots__ = ("offset", "source_stack", "layer", "layer_scale")
+
+    def __init__(self, view, pos):
+        super().__init__(view, pos)
         self.offset = (0, 0)
         self.draw_empty = False
         self.source_stack = None
+        # The dragged cards rendered into one surface, so moving them only
+        # moves the surface
+        self.layer: pygame.Surface = None
+        self.layer_scale = None
 
     def _set_mouse_pos(self, mp):
         self.pos = (mp[0] - self.offset[0], mp[1] - self.offset[1])
-        self.reset_pos()
 
     mouse_pos = property(fset=_set_mouse_pos)
 
+    def lift(self, stack: Stack, amount, mouse_pos):
+        self.cards.extend(islice(stack.cards, stack.size-amount, None))
+        self.source_stack = stack
+        stack.lifted = amount
+        self.pos = self.card_on_bottom.pos
+        self.offset = (mouse_pos[0] - self.pos[0], mouse_pos[1] - self.pos[1])
+        self.render_layer()
+
+    # Writes the card positions back and gives the cards back to their stack
+    def drop(self) -> Stack:
+        self.reset_pos()
+        self.source_stack.lifted = 0
+        self.cards.clear()
+        self.layer = None
+        return self.source_stack
+
+    def render_layer(self):
+        scale = self.layer_scale = self.view.scale
+        rect = self.rect
+        self.layer = assets.convert(pygame.Surface((round(rect.width*scale), round(rect.height*scale)), pygame.SRCALPHA))
+        self.layer.fill(constants.TRANSPARENT)
+        for card, pos in zip(self.cards, self.get_card_pos()):
+            self.layer.blit(card.refresh_surface(), ((pos[0] - self.pos[0])*scale, (pos[1] - self.pos[1])*scale))
+
+    def draw(self, screen):
+        if self.is_empty:
+            return
+        if self.layer_scale != self.view.scale:
+            self.render_layer()
+        screen.blit(self.layer, self.view.game_to_screen(self.pos))
+
+    def collect(self, blits, screen):
+        if self.is_empty:
+            return
+        if self.layer_scale != self.view.scale:
+            self.render_layer()
+        blits.append((self.layer, self.view.game_to_screen(self.pos)))
+
     def get_cards_to_drag(self, pos):
         return 0
@@ -0,0 +1,243 @@
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import time
+from abc import ABC, abstractmethod
+from enum import Enum, auto
+
+from game import Game
+from solver import FOUNDATION, TABLEAU, TALON, Position, card_id, solve, suit
+
+
+class Action(Enum):
+    DEAL = auto()
+    COLLECT = auto()
+    MOVE = auto()
+
+
+# (Action.DEAL,), (Action.COLLECT, stack) or (Action.MOVE, from_stack, to_stack, amount)
+Decision = tuple
+
+
+class Strategy(ABC):
+    name = None
+
+    # Returns None to give up. Excluded decisions were tried in this position
+    # and led back to an earlier one
+    @abstractmethod
+    def choose(self, game: Game, excluded: set[Decision]) -> Decision:
+        pass
+
+    # Best of the game's legal moves by the given scores of MoveGenerator.score
+    @staticmethod
+    def best_move(game: Game, excluded, scores):
+        best, best_score = None, 0
+        for move in game.moves.legal_moves:
+            score = scores[game.moves.score(move)]
+            if score > best_score and (Action.MOVE, *move) not in excluded:
+                best, best_score = (Action.MOVE, *move), score
+        if best is not None:
+            return best
+        return (Action.DEAL,) if game.moves.deal_helps else None
+
+
+# Turns a solver move into what has to be done in the game to make it. Talon
+# cards other than the top of the waste have to be dealt to first
+def decision_for(game: Game, move) -> Decision:
+    src, index, amount, dst, target = move
+    if src == TABLEAU:
+        from_stack = game.tableaus[index]
+    elif src == FOUNDATION:
+        from_stack = next(f for f in game.foundations if not f.is_empty and card_id(f.card_on_top) & 3 == index)
+    elif index == game.waste.size-1:
+        from_stack = game.waste
+    else:
+        return (Action.DEAL,)
+
+    if dst == TABLEAU:
+        return Action.MOVE, from_stack, game.tableaus[target], amount
+    return Action.COLLECT, from_stack
+
+
+# Plays the move the hint button would show
+class FoundationFirst(Strategy):
+    name = "foundation"
+    SCORES = {4: 4, 3: 3, 2: 2, 1: 1, 0: 0}
+
+    def choose(self, game, excluded):
+        return self.best_move(game, excluded, self.SCORES)
+
+
+# Builds on the tableaus and only plays to the foundations when there's
+# nothing else to do
+class TableauFirst(Strategy):
+    name = "tableau"
+    SCORES = {4: 1, 3: 4, 2: 3, 1: 2, 0: 0}
+
+    def choose(self, game, excluded):
+        return self.best_move(game, excluded, self.SCORES)
+
+
+# Plays the move with the best board k moves later, counting dealing to any
+# talon card the remaining passes reach as free
+class Lookahead(Strategy):
+    def __init__(self, depth=2):
+        super().__init__()
+        self.depth = depth
+        self.name = f"lookahead{depth}"
+
+    @staticmethod
+    def evaluate(position: Position):
+        return 3*sum(position.foundations) - 2*sum(len(down) for down, _ in position.tableaus)
+
+    def search(self, position: Position, depth):
+        score = self.evaluate(position)
+        if depth:
+            for move in position.moves():
+                score = max(score, self.search(position.apply(move), depth-1))
+        return score
+
+    def choose(self, game, excluded):
+        position = Position.from_game(game)
+        best, best_score = None, self.evaluate(position)
+        for move in position.moves():
+            decision = decision_for(game, move)
+            if decision in excluded:
+                continue
+            score = self.search(position.apply(move), self.depth-1)
+            if score > best_score:
+                best, best_score = decision, score
+        if best is not None:
+            return best
+        # Nothing gets anywhere within the horizon
+        return self.best_move(game, excluded, FoundationFirst.SCORES)
+
+
+# Plays the first move of a winning line when the solver finds one in its
+# budget. Once it doesn't, the rest of the game is left to FoundationFirst
+class SolverGuided(Strategy):
+    name = "solver"
+
+    def __init__(self, max_nodes=20_000):
+        super().__init__()
+        self.max_nodes = max_nodes
+        self.fallback = FoundationFirst()
+        self.game = None
+        self.solving = False
+
+    @staticmethod
+    def auto_move(position: Position):
+        for i, (_, up) in enumerate(position.tableaus):
+            if up and position.to_foundation(up[-1]) and position.is_safe(up[-1]):
+                return TABLEAU, i, 1, FOUNDATION, suit(up[-1])
+        for i in position.auto_talon():
+            c = position.talon[i]
+            if position.to_foundation(c) and position.is_safe(c):
+                return TALON, i, 1, FOUNDATION, suit(c)
+        return None
+
+    def choose(self, game, excluded):
+        if game is not self.game:
+            self.game, self.solving = game, True
+        if not self.solving:
+            return self.fallback.choose(game, excluded)
+
+        position = Position.from_game(game)
+        # The solver makes the safe moves before the line it returns
+        move = self.auto_move(position)
+        if move is None:
+            move = solve(position, self.max_nodes).move
+            self.solving = move is not None
+        if move is None or decision_for(game, move) in excluded:
+            return self.fallback.choose(game, excluded)
+        return decision_for(game, move)
+
+
+class Outcome():
+    def __init__(self, won, moves, decisions, seconds):
+        super().__init__()
+        self.won = won
+        # Actions taken in the game, deals included
+        self.moves = moves
+        self.decisions = decisions
+        self.seconds = seconds
+
+
+# Lets a strategy play a dealt game one decision at a time. A move that leads
+# back to an earlier position is taken back and excluded. The game is over
+# once it's won, or the strategy gives up or deals a whole round without
+# doing anything else
+class Player():
+    def __init__(self, strategy: Strategy, game: Game, max_decisions=1000):
+        super().__init__()
+        self.strategy = strategy
+        self.game = game
+        self.max_decisions = max_decisions
+        self.seen = {Position.from_game(game).key}
+        self.excluded: set[Decision] = set()
+        self.dealt = 0
+        self.decisions = 0
+        self.done = False
+
+    # Returns False once the game is over
+    def step(self):
+        game = self.game
+        self.done = self.done or game.won or self.decisions >= self.max_decisions
+        if self.done:
+            return False
+
+        decision = self.strategy.choose(game, self.excluded)
+        self.decisions += 1
+        if decision is None:
+            self.done = True
+            return False
+
+        action, *args = decision
+        if action == Action.DEAL:
+            self.dealt += 1
+            if self.dealt > game.stock.size + game.waste.size + 1:
+                self.done = True
+                return False
+            game.deal_card()
+            return True
+
+        self.dealt = 0
+        if action == Action.COLLECT:
+            game.collect_card(*args)
+        else:
+            game.move_cards(*args)
+
+        key = Position.from_game(game).key
+        if key in self.seen:
+            game.undo()
+            self.excluded.add(decision)
+        else:
+            self.seen.add(key)
+            self.excluded.clear()
+        return True
+
+
+# Plays one deal without drawing anything
+def play(strategy: Strategy, seed, max_decisions=1000) -> Outcome:
+    game = Game(None, seed)
+    settle(game)
+    player = Player(strategy, game, max_decisions)
+    start = time.perf_counter()
+    while player.step():
+        settle(game)
+    return Outcome(game.won, len(game.history.past), player.decisions, time.perf_counter() - start)
+
+
+# Moves are applied as they're animated, so this finishes them straight away
+def settle(game: Game):
+    game.cancel_animations()
+    game.animations.clear()
+
+
+STRATEGIES = {
+    "foundation": lambda args: FoundationFirst(),
+    "tableau": lambda args: TableauFirst(),
+    "lookahead": lambda args: Lookahead(args.depth),
+    "solver": lambda args: SolverGuided(args.max_nodes),
+}
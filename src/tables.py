@@ -0,0 +1,280 @@
+import os
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import math
+import random
+import statistics
+
+import pygame
+
+import assets
+import constants
+from game import Game
+from observer import Change
+from screen import RendererScreen, SurfaceScreen
+from strategy import STRATEGIES, Player, Strategy
+from variant import KLONDIKE, VARIANTS, Variant
+from view import View
+
+MIN_TABLES = 2
+MAX_TABLES = 16
+# The window the tables are fitted in when it opens
+WINDOW = 1600, 900
+# How long a won table shows its victory before an auto player deals again
+WIN_DELAY = 2000
+
+
+# One game in its cell of the window. Each table has its own history, timer
+# and view, the card surfaces are shared by all of them
+class Table():
+    def __init__(self, number, variant: Variant, strategy: Strategy = None, max_decisions=1000):
+        super().__init__()
+        self.number = number
+        self.variant = variant
+        self.view = View()
+        self.strategy = strategy
+        self.max_decisions = max_decisions
+        self.player: Player = None
+        self.wins = 0
+        self.games = 0
+        self.won_for = 0
+        self.new_game()
+
+    def new_game(self, seed=None):
+        self.game = Game(self.view, seed, self.variant)
+        self.game.subscribe(Change.WIN, self.on_win)
+        self.player = None
+        self.won_for = 0
+        self.games += 1
+
+    def on_win(self):
+        self.game.paused = True
+        self.wins += 1
+
+    # Shared frame time, so every table animates at the same pace
+    def update(self, time):
+        game = self.game
+        if game.paused:
+            self.won_for += time
+            if self.strategy is not None and self.won_for >= WIN_DELAY:
+                self.new_game()
+            return
+
+        game.update(time)
+        # The auto player only looks at settled boards
+        if self.strategy is None or game.animations:
+            return
+        if self.player is None:
+            self.player = Player(self.strategy, game, self.max_decisions)
+        if not self.player.step() and not game.won:
+            self.new_game()
+
+    def contains(self, pos):
+        return 0 <= pos[0] <= self.variant.width and -constants.APPBAR_HEIGHT <= pos[1] <= self.variant.height - constants.APPBAR_HEIGHT
+
+
+class Tables():
+    def __init__(self, count, renderer=None, seed=None, variant: Variant = KLONDIKE, strategy=None, options=None):
+        super().__init__()
+        self.variant = variant
+        self.seed = random.randrange(2**32) if seed is None else seed
+        random.seed(self.seed)
+
+        pygame.display.init()
+        pygame.font.init()
+        assets.load_bundle()
+
+        self.columns = math.ceil(math.sqrt(count))
+        self.rows = math.ceil(count/self.columns)
+        self.scale = min(WINDOW[0]/(self.columns*variant.width), WINDOW[1]/(self.rows*variant.height))
+        size = round(self.columns*variant.width*self.scale), round(self.rows*variant.height*self.scale)
+        if renderer is None:
+            self.screen = SurfaceScreen(size, "Solitaire", assets.get_icon())
+        else:
+            self.screen = RendererScreen(size, "Solitaire", assets.get_icon(), renderer or None)
+        assets.load_svgs_async()
+
+        # Each table gets its own strategy, some of them keep state per game
+        self.tables = [Table(i+1, variant, STRATEGIES[strategy](options) if strategy else None, options.max_decisions if options else 1000) for i in range(count)]
+        self.clock = pygame.time.Clock()
+        self.frame_times = []
+        # Table a drag started on, it gets every event until the button is released
+        self.pressed: Table = None
+        self.pressed_pos = None
+        self.dragging = False
+        self.resize(size)
+
+        self.running = True
+
+    def resize(self, size):
+        width, height = size
+        v = self.variant
+        self.scale = min(width/(self.columns*v.width), height/(self.rows*v.height))
+        left = (width/self.scale - self.columns*v.width)*.5
+        for i, table in enumerate(self.tables):
+            row, column = divmod(i, self.columns)
+            table.view.place((left + column*v.width, row*v.height + constants.APPBAR_HEIGHT), self.scale)
+
+        # One set of rendered cards for every table
+        assets.render_svgs(self.scale)
+        self.render(self.scale)
+
+    def render(self, scale):
+        v = self.variant
+        self.font = pygame.font.Font(assets.normalize_path("Roboto-Medium.ttf"), round(16*scale))
+        self.app_bar = assets.convert(pygame.Surface((round(v.width*scale), round(constants.APPBAR_HEIGHT*scale)), pygame.SRCALPHA))
+        self.app_bar.fill(constants.APPBAR_COLOR)
+        self.win_surf = assets.convert(pygame.Surface((round(v.width*scale), round((v.height - constants.APPBAR_HEIGHT)*scale)), pygame.SRCALPHA))
+        self.win_surf.fill(constants.BLACK + (constants.DISABLED_ALPHA,))
+        text = pygame.font.Font(assets.normalize_path("Roboto-Regular.ttf"), round(48*scale)).render("Victory!", True, constants.WHITE)
+        text.set_alpha(constants.ENABLED_ALPHA)
+        self.win_surf.blit(text, ((self.win_surf.get_width()-text.get_width())/2, (self.win_surf.get_height()-text.get_height())/2))
+        # Texts of each table, rendered again when they change
+        self.texts = {}
+
+    def text(self, table: Table):
+        time = table.game.time//1000
+        key = time, table.wins, table.games
+        text = self.texts.get(table.number)
+        if text is None or text[0] != key:
+            surface = self.font.render(f"#{table.number}   {time//60:02d}:{time%60:02d}   {table.wins}/{table.games}", True, constants.WHITE)
+            surface.set_alpha(constants.ENABLED_ALPHA)
+            text = self.texts[table.number] = key, surface
+        return text[1]
+
+    def table_at(self, pos):
+        for table in self.tables:
+            if table.contains(table.view.screen_to_game(pos)):
+                return table
+
+    def loop(self, frames=None, fps=200):
+        while self.running and (frames is None or len(self.frame_times) < frames):
+            self.clock.tick(fps)
+            print(f"FPS: {self.clock.get_fps():3.0f}", end="\r")
+            self.events()
+            self.frame()
+        self.report()
+
+    def frame(self):
+        time = self.clock.get_time()
+        self.frame_times.append(time)
+        for table in self.tables:
+            table.update(time)
+
+        screen = self.screen
+        screen.fill(constants.BACKGROUND_COLOR)
+        # Every board goes in one batch
+        blits = []
+        for table in self.tables:
+            table.game.collect(blits, screen)
+        screen.blits(blits)
+
+        for table in self.tables:
+            x, y = table.view.game_to_screen((0, -constants.APPBAR_HEIGHT))
+            screen.blit(self.app_bar, (x, y))
+            text = self.text(table)
+            screen.blit(text, (x + (self.app_bar.get_width()-text.get_width())/2, y + (self.app_bar.get_height()-text.get_height())/2))
+            if table.game.won and table.game.paused:
+                screen.blit(self.win_surf, table.view.game_to_screen((0, 0)))
+        screen.flip()
+
+    def report(self):
+        # The first frames include loading the assets
+        times = sorted(self.frame_times[10:])
+        if not times:
+            return
+        print(f"{len(self.tables)} tables, {len(times)} frames: mean {statistics.fmean(times):.1f} ms, "
+              f"p99 {times[min(len(times)-1, len(times)*99//100)]} ms, worst {times[-1]} ms")
+        for table in self.tables:
+            print(f"Table {table.number}: won {table.wins} of {table.games}")
+
+    # region Events
+    def events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == self.screen.RESIZE_EVENT:
+                self.resize(self.screen.event_size(event))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.on_mousedown(event)
+            elif event.type == pygame.MOUSEMOTION:
+                self.on_mousemove(event)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                self.on_mouseup(event)
+            elif event.type == pygame.KEYDOWN:
+                self.on_key(event)
+
+    def on_mousedown(self, event):
+        if event.button == pygame.BUTTON_LEFT:
+            self.pressed = self.table_at(event.pos)
+            self.pressed_pos = event.pos
+
+    def on_mousemove(self, event):
+        table = self.pressed
+        if table is None or not event.buttons[0]:
+            return
+
+        if not self.dragging:
+            self.dragging = True
+            table.game.on_mousedragbegin_l(table.view.screen_to_game(self.pressed_pos))
+        table.game.on_mousedrag_l(table.view.screen_to_game(event.pos))
+
+    def on_mouseup(self, event):
+        if event.button == pygame.BUTTON_LEFT:
+            table, self.pressed = self.pressed, None
+            if self.dragging:
+                self.dragging = False
+                table.game.on_mousedragend_l(table.view.screen_to_game(event.pos))
+                return
+
+        table = self.table_at(event.pos)
+        if table is None:
+            return
+        if table.game.won and table.game.paused:
+            table.new_game()
+        elif event.button == pygame.BUTTON_LEFT:
+            table.game.on_mouseclick_l(table.view.screen_to_game(event.pos))
+        elif event.button == pygame.BUTTON_MIDDLE:
+            table.game.on_mouseclick_m(table.view.screen_to_game(event.pos))
+
+    def on_key(self, event):
+        # Keys act on the table under the mouse
+        table = self.table_at(pygame.mouse.get_pos())
+        if event.key == pygame.K_ESCAPE:
+            self.running = False
+        elif table is None:
+            return
+        elif event.key == pygame.K_n and event.mod & pygame.KMOD_CTRL:
+            table.new_game()
+        elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+            table.game.undo()
+        elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+            table.game.redo()
+        elif event.key == pygame.K_d:
+            table.game.deal_card()
+        elif event.key == pygame.K_c:
+            table.game.collect_all()
+    # endregion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play several games of solitaire side by side")
+    parser.add_argument("-n", "--tables", type=int, default=4, help=f"number of tables ({MIN_TABLES}-{MAX_TABLES})")
+    parser.add_argument("--renderer", nargs="?", const="", metavar="DRIVER", help="draw with an SDL renderer instead of software blits, optionally picking its driver")
+    parser.add_argument("--seed", type=int, help="seed for the deals")
+    parser.add_argument("--variant", choices=VARIANTS, default=KLONDIKE.name, help="game to play")
+    parser.add_argument("--auto", metavar="STRATEGY", help=f"let a strategy play every table: {', '.join(STRATEGIES)}")
+    parser.add_argument("-k", "--depth", type=int, default=2, help="plies searched by the lookahead strategy")
+    parser.add_argument("-m", "--max-nodes", type=int, default=20_000, help="solver budget per decision of the solver strategy")
+    parser.add_argument("--max-decisions", type=int, default=1000, help="decisions before an auto played game is dealt again")
+    parser.add_argument("--frames", type=int, help="quit after this many frames")
+    parser.add_argument("--fps", type=int, default=200, help="frame rate cap")
+    args = parser.parse_args()
+    if not MIN_TABLES <= args.tables <= MAX_TABLES:
+        parser.error(f"the number of tables must be between {MIN_TABLES} and {MAX_TABLES}")
+    if args.auto is not None and args.auto not in STRATEGIES:
+        parser.error(f"unknown strategy {args.auto}")
+
+    Tables(args.tables, args.renderer, args.seed, VARIANTS[args.variant], args.auto, args).loop(args.frames, args.fps)
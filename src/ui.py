@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
 from enum import Enum, auto
+from functools import partial
 
 import pygame
 
 import assets
 import constants
+from checker import Winnable
+from deals import BUCKETS
+from observer import Change
 
 
 class Button(ABC):
@@ -18,11 +22,11 @@ class Button(ABC):
 
     @abstractmethod
     def render(self, scale):
-        self.surf = pygame.Surface(self.size).convert_alpha()
+        self.surf = assets.convert(pygame.Surface(self.size, pygame.SRCALPHA))
         self.surf.fill(constants.TRANSPARENT)
-        self.disabled_surf = pygame.Surface(self.size).convert_alpha()
+        self.disabled_surf = assets.convert(pygame.Surface(self.size, pygame.SRCALPHA))
         self.disabled_surf.fill(constants.TRANSPARENT)
-        self.hovered_surf = pygame.Surface(self.size).convert_alpha()
+        self.hovered_surf = assets.convert(pygame.Surface(self.size, pygame.SRCALPHA))
         self.hovered_surf.fill(constants.TRANSPARENT)
 
     @abstractmethod
@@ -30,7 +34,7 @@ class Button(ABC):
         return False
 
     def draw(self, screen):
-        if not self.enabled():
+        if not self.enabled:
             screen.blit(self.disabled_surf, self.pos)
         elif self.hovered:
             screen.blit(self.hovered_surf, self.pos)
@@ -45,7 +49,7 @@ class TextButton(Button):
     def render_font(cls, scale):
         cls.font = pygame.font.Font(assets.normalize_path("Roboto-Medium.ttf"), round(14*scale))
 
-    def __init__(self, pos, width, scale, text, onclick, enabled=lambda: True):
+    def __init__(self, pos, width, scale, text, onclick, enabled=True):
         pos = round(pos[0]*scale), round(pos[1]*scale)
         size = round(width*scale), round(36*scale)
         super().__init__(pos, size, onclick, enabled)
@@ -74,7 +78,7 @@ class TextButton(Button):
 
 
 class IconButton(Button):
-    def __init__(self, pos, scale, icon, onclick, enabled=lambda: True):
+    def __init__(self, pos, scale, icon, onclick, enabled=True):
         pos = round(pos[0]*scale), round(pos[1]*scale)
         size = round(48*scale), round(48*scale)
         super().__init__(pos, size, onclick, enabled)
@@ -111,8 +115,10 @@ class UI():
     def __init__(self, app):
         super().__init__()
         self.app = app
-        self.current = UIType.HOME
+        self._current = UIType.HOME
         self.game_time = -1
+        self.game_rendered = False
+        self.hand_cursor = False
 
         self.draw_methods = {
             UIType.HOME: self.draw_home_ui,
@@ -125,9 +131,31 @@ class UI():
             UIType.WIN: lambda: self.win_buttons
         }
 
+    @property
+    def current(self):
+        return self._current
+
+    @current.setter
+    def current(self, value):
+        if value != UIType.HOME and not self.game_rendered:
+            self.render_game(self.size, self.scale)
+            self.render_win(self.size, self.scale)
+            self.game_rendered = True
+        self._current = value
+
     def home(self):
         self.current = UIType.HOME
 
+    def watch(self, game):
+        game.history.subscribe(Change.HISTORY, self.update_history_buttons)
+        if self.game_rendered:
+            self.update_history_buttons()
+
+    def update_history_buttons(self):
+        history = self.app.game.history
+        self.undo_button.enabled = bool(history.past)
+        self.redo_button.enabled = bool(history.future)
+
     def draw_background(self, screen):
         screen.fill(constants.BACKGROUND_COLOR)
 
@@ -137,6 +165,7 @@ class UI():
             button.draw(screen)
 
     def draw_game(self, screen: pygame.Surface):
+        self.app.game.update(self.app.clock.get_time())
         self.app.game.draw(screen)
         screen.blit(self.app_bar, (0, 0))
 
@@ -147,6 +176,11 @@ class UI():
             self.time_text.set_alpha(constants.ENABLED_ALPHA)
 
         screen.blit(self.time_text, ((self.app_bar.get_width()-self.time_text.get_width())/2, (self.app_bar.get_height()-self.time_text.get_height())/2))
+
+        if self.app.game.variant.solvable:
+            self.app.checker.update(self.app.game)
+            status = self.status_texts[self.app.checker.status]
+            screen.blit(status, (self.status_right - status.get_width(), (self.app_bar.get_height()-status.get_height())/2))
         for button in self.game_buttons:
             button.draw(screen)
 
@@ -169,35 +203,54 @@ class UI():
         self.draw_background(screen)
         self.draw_methods[self.current](screen)
 
-        pygame.display.flip()
+        screen.flip()
 
     def middle(self, size, scale):
         return size[0]/scale/2
 
     def render_home(self, size, scale):
-        self.home_surf = pygame.Surface(size).convert_alpha()
+        self.home_surf = assets.convert(pygame.Surface(size, pygame.SRCALPHA))
         self.home_surf.fill(constants.TRANSPARENT)
         text = self.big_font.render("Solitaire", True, constants.WHITE)
         text.set_alpha(constants.ENABLED_ALPHA)
         self.home_surf.blit(text, ((size[0]-text.get_width())/2, 128*scale))
 
         self.home_buttons = [
-            TextButton((self.middle(size, scale)-64, 256), 128, scale, "NEW GAME", lambda: self.app.new_game()),
+            TextButton((self.middle(size, scale)-64, 256), 128, scale, "NEW GAME", lambda: self.app.new_game(False)),
+            TextButton((self.middle(size, scale)-64, 304), 128, scale, "WINNABLE", lambda: self.app.new_game(True), self.app.variant.is_klondike and self.app.deals.count() > 0),
+        ] + [
+            TextButton((self.middle(size, scale) - 134 + i*92, 352), 84, scale, level.upper(), partial(self.app.new_game, True, level), self.app.variant.is_klondike and self.app.deals.count(level) > 0)
+            for i, level in enumerate(BUCKETS)
         ]
 
     def render_game(self, size, scale):
-        self.app_bar = pygame.Surface((size[0], round(constants.APPBAR_HEIGHT*scale))).convert_alpha()
+        self.app_bar = assets.convert(pygame.Surface((size[0], round(constants.APPBAR_HEIGHT*scale)), pygame.SRCALPHA))
         self.app_bar.fill(constants.APPBAR_COLOR)
         self.appbar_font = pygame.font.Font(assets.normalize_path("Roboto-Medium.ttf"), round(20*scale))
 
+        status_font = pygame.font.Font(assets.normalize_path("Roboto-Regular.ttf"), round(14*scale))
+        self.status_texts = {
+            Winnable.CHECKING: status_font.render("Checking...", True, constants.WHITE),
+            Winnable.WINNABLE: status_font.render("Winnable", True, constants.WHITE),
+            Winnable.UNKNOWN: status_font.render("Unknown", True, constants.WHITE),
+            Winnable.LOST: status_font.render("Lost", True, constants.WHITE),
+        }
+        for text in self.status_texts.values():
+            text.set_alpha(constants.ENABLED_ALPHA)
+        self.status_right = (self.app.origin[0] + self.app.variant.width - 104)*scale
+
+        self.undo_button = IconButton((self.app.origin[0] + self.app.variant.width - 96, 0), scale, "undo", lambda: self.app.game.undo())
+        self.redo_button = IconButton((self.app.origin[0] + self.app.variant.width - 48, 0), scale, "redo", lambda: self.app.game.redo())
         self.game_buttons = [
             IconButton((self.app.origin[0] + 8, 0), scale, "pause", lambda: self.app.game.pause()),
             IconButton((self.app.origin[0] + 56, 0), scale, "chevron-up", lambda: self.app.game.collect_all()),
-            IconButton((self.app.origin[0] + constants.WIDTH - 96, 0), scale, "undo", lambda: self.app.game.undo(), lambda: self.app.game.history.past),
-            IconButton((self.app.origin[0] + constants.WIDTH - 48, 0), scale, "redo", lambda: self.app.game.redo(), lambda: self.app.game.history.future)
+            self.undo_button,
+            self.redo_button
         ]
+        if self.app.game is not None:
+            self.update_history_buttons()
 
-        self.paused_surf = pygame.Surface(size).convert_alpha()
+        self.paused_surf = assets.convert(pygame.Surface(size, pygame.SRCALPHA))
         self.paused_surf.fill(constants.BLACK + (constants.DISABLED_ALPHA,))
         text = self.title_font.render("Paused", True, constants.WHITE)
         text.set_alpha(constants.ENABLED_ALPHA)
@@ -212,7 +265,7 @@ class UI():
         ]
 
     def render_win(self, size, scale):
-        self.win_surf = pygame.Surface(size).convert_alpha()
+        self.win_surf = assets.convert(pygame.Surface(size, pygame.SRCALPHA))
         self.win_surf.fill(constants.TRANSPARENT)
         text = self.big_font.render("Victory!", True, constants.WHITE)
         text.set_alpha(constants.ENABLED_ALPHA)
@@ -224,29 +277,33 @@ class UI():
         ]
 
     def render(self, size, scale):
+        self.size, self.scale = size, scale
         self.title_font = pygame.font.Font(assets.normalize_path("Roboto-Regular.ttf"), round(48*scale))
         self.big_font = pygame.font.Font(assets.normalize_path("Roboto-Regular.ttf"), round(96*scale))
         TextButton.render_font(scale)
         self.render_home(size, scale)
-        self.render_game(size, scale)
-        self.render_win(size, scale)
+        # The game and win screens need the icons, so they're rendered when first shown
+        self.game_rendered = False
+        self.current = self.current
 
     # region Mouse events
     def on_mousemove(self, event):
         bo = False
         for b in self.buttons[self.current]():
-            if b.inside(event.pos) and b.enabled():
-                b.hovered = True
-                bo = True
-            else:
-                b.hovered = False
-        if bo:
-            pygame.mouse.set_system_cursor(pygame.SYSTEM_CURSOR_HAND)
-        else:
-            pygame.mouse.set_system_cursor(pygame.SYSTEM_CURSOR_ARROW)
+            b.hovered = b.inside(event.pos) and b.enabled
+            bo = bo or b.hovered
+
+        if bo == self.hand_cursor:
+            return
+        self.hand_cursor = bo
+        try:
+            pygame.mouse.set_system_cursor(pygame.SYSTEM_CURSOR_HAND if bo else pygame.SYSTEM_CURSOR_ARROW)
+        except pygame.error:
+            # There are no system cursors with the dummy video driver
+            pass
 
     def on_mouseclick_l(self, event):
         for b in self.buttons[self.current]():
-            if b.inside(event.pos) and b.enabled():
+            if b.inside(event.pos) and b.enabled:
                 b.onclick()
     # endregion
@@ -0,0 +1,68 @@
+import constants
+from card import Suit, Symbol
+
+DECK_SIZE = len(Suit)*len(Symbol)
+
+
+# Deck count, board size and stock rules of a game, and the layout that
+# follows from them
+class Variant():
+    def __init__(self, name, decks=1, tableaus=7, draw=1, redeals=None):
+        super().__init__()
+        if tableaus*(tableaus+1)//2 > decks*DECK_SIZE:
+            raise ValueError(f"{decks} deck(s) can't fill {tableaus} tableaus")
+
+        self.name = name
+        self.decks = decks
+        self.tableaus = tableaus
+        self.foundations = decks*len(Suit)
+        self.cards = decks*DECK_SIZE
+        # Cards dealt from the stock at a time, and how often the waste can be
+        # turned over into the stock again, None for no limit
+        self.draw = draw
+        self.redeals = redeals
+
+        # Foundations, then the waste fanned over two columns and the stock
+        self.columns = max(tableaus, self.foundations + 3)
+        self.width = constants.CARD_WIDTH*self.columns + constants.MARGIN*(self.columns-1) + constants.BIG_MARGIN*2
+        # Room for the face down cards of the last tableau and a full run on them
+        self.height = constants.APPBAR_HEIGHT + constants.BIG_MARGIN + constants.CARD_HEIGHT_MARGIN + 14*constants.BIG_MARGIN + (tableaus-1)*constants.MARGIN
+        self.ratio = self.width/self.height
+
+    # The solver and the deals index only know single deck games
+    @property
+    def solvable(self):
+        return self.decks == 1
+
+    # The deals index is made for the standard rules
+    @property
+    def is_klondike(self):
+        return self.decks == 1 and self.tableaus == 7 and self.draw == 1 and self.redeals is None
+
+    def column_x(self, column):
+        return column*constants.CARD_WIDTH_MARGIN + constants.BIG_MARGIN
+
+    def foundation_pos(self, i):
+        return self.column_x(i), constants.BIG_MARGIN
+
+    def waste_pos(self):
+        return self.column_x(self.foundations), constants.BIG_MARGIN
+
+    def stock_pos(self):
+        return self.column_x(self.columns-1), constants.BIG_MARGIN
+
+    def tableau_pos(self, i):
+        # Centered when the top row is wider
+        offset = (self.columns - self.tableaus)*constants.CARD_WIDTH_MARGIN//2
+        return self.column_x(i) + offset, constants.CARD_HEIGHT_MARGIN + constants.BIG_MARGIN
+
+    def to_dict(self):
+        return {"name": self.name, "decks": self.decks, "tableaus": self.tableaus, "draw": self.draw, "redeals": self.redeals}
+
+
+KLONDIKE = Variant("klondike")
+DOUBLE_KLONDIKE = Variant("double", 2, 9)
+DRAW_THREE = Variant("draw3", draw=3)
+# Three passes through the stock
+VEGAS = Variant("vegas", draw=3, redeals=2)
+VARIANTS = {v.name: v for v in (KLONDIKE, DOUBLE_KLONDIKE, DRAW_THREE, VEGAS)}
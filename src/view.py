@@ -0,0 +1,20 @@
+# Where a board is drawn: game coordinates are offset by the origin, then
+# scaled to the screen
+class View():
+    def __init__(self, origin=(0, 0), scale=1):
+        super().__init__()
+        self.origin = origin
+        self.scale = scale
+        # Bumped whenever the transform changes, so screen positions cached
+        # by cards and stacks are computed again
+        self.layout = 0
+
+    def place(self, origin, scale):
+        self.origin, self.scale = origin, scale
+        self.layout += 1
+
+    def screen_to_game(self, coords):
+        return (coords[0]/self.scale - self.origin[0], coords[1]/self.scale - self.origin[1])
+
+    def game_to_screen(self, coords):
+        return ((coords[0] + self.origin[0])*self.scale, (coords[1] + self.origin[1])*self.scale)